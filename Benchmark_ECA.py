@@ -0,0 +1,219 @@
+# Benchmark suite for ECA simulation and rendering throughput. Every case
+# runs in a fresh process so its peak RSS is its own; results are saved
+# as a JSON baseline that later runs are compared against.
+
+import ECA as eca
+import Generate_ECA as generate
+import numpy as np
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import multiprocessing as mp
+
+RULES = (30, 90, 110, 184)
+BOUNDARIES = ('periodic', 'null')
+WIDTHS = (10**2, 10**3, 10**4, 10**5, 10**6)
+GENERATIONS = (10**2, 10**3, 10**4, 10**5)
+BACKENDS = ('numpy', 'packed')
+MODES = ('ascii', 'html', 'ppm', 'pgm', 'pbm', 'png', '3d', 'tiles')
+
+# The quick matrix, for a run of a minute or so
+QUICK_RULES = (30, 110)
+QUICK_WIDTHS = (10**2, 10**3, 10**4)
+QUICK_GENERATIONS = (10**2, 10**3)
+
+# cases returns the benchmark matrix as a list of (name, kind, params),
+# leaving out simulations of more than max_cells cells and renders of
+# more than max_render_cells.
+def cases(quick=False, max_cells=10**8, max_render_cells=10**7):
+    rules = QUICK_RULES if quick else RULES
+    widths = QUICK_WIDTHS if quick else WIDTHS
+    generations = QUICK_GENERATIONS if quick else GENERATIONS
+    out = []
+    for width in widths:
+        out.append((f"init/random/w{width}", 'init', dict(width=width)))
+    for rule in rules:
+        for boundary in BOUNDARIES:
+            for width in widths:
+                for gens in generations:
+                    size = dict(rule=rule, boundary=boundary, width=width, generations=gens)
+                    tag = f"rule{rule}/{boundary}/w{width}/g{gens}"
+                    if width * gens <= max_cells:
+                        for backend in BACKENDS:
+                            out.append((f"sim/{backend}/{tag}", 'sim', dict(size, backend=backend)))
+                    if width * gens <= max_render_cells:
+                        for mode in MODES:
+                            if mode == '3d' and boundary != 'periodic':
+                                continue
+                            out.append((f"render/{mode}/{tag}", 'render', dict(size, mode=mode)))
+    return out
+
+# peak_rss_mb returns the peak resident set size of this process in MB,
+# or None where getrusage isn't available (Windows).
+def peak_rss_mb():
+    if sys.platform == 'win32':
+        return None
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss /= 1024
+    return rss / 1024
+
+# output_size returns the bytes in a file, or in all files under a directory.
+def output_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, f))
+                   for root, _, files in os.walk(path) for f in files)
+    return os.path.getsize(path)
+
+# run_case runs one case repeat times, returning its best time and
+# throughput along with the peak RSS of the process.
+def run_case(kind, params, repeat):
+    best = None
+    written = 0
+    for _ in range(repeat):
+        if kind == 'init':
+            start = time.perf_counter()
+            generate.randbstr(params['width'])
+            seconds = time.perf_counter() - start
+            cells = params['width']
+        elif kind == 'sim':
+            state = generate.random_state(params['width'], seed=0)
+            if params['backend'] == 'packed':
+                myrule = eca.PackedECA(params['rule'])
+                start = time.perf_counter()
+                myrule.N_Gens(state, params['boundary'], params['generations'], packed=True)
+            else:
+                myrule = eca.ECA(params['rule'])
+                start = time.perf_counter()
+                myrule.N_Gens(state, params['boundary'], params['generations'])
+            seconds = time.perf_counter() - start
+            cells = generate.cell_updates(params['width'], params['boundary'], params['generations'])
+        else:
+            state = generate.random_state(params['width'], seed=0)
+            myrule = eca.PackedECA(params['rule'])
+            directory = tempfile.mkdtemp(prefix='eca_bench_')
+            try:
+                output = os.path.join(directory, 'out')
+                data = myrule.iter_gens(state, params['boundary'], params['generations'])
+                start = time.perf_counter()
+                with open(os.devnull, 'w') as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull
+                    try:
+                        generate.visualize_eca(data, mode=params['mode'], downsample=1,
+                                               output_file=output, boundary=params['boundary'],
+                                               rule=params['rule'], height=params['generations'],
+                                               open_browser=False)
+                    finally:
+                        sys.stdout = stdout
+                seconds = time.perf_counter() - start
+                written = output_size(output)
+            finally:
+                shutil.rmtree(directory)
+            cells = params['width'] * params['generations']
+        if best is None or seconds < best:
+            best = seconds
+    result = {'seconds': best, 'cells_per_s': cells / best if best else None,
+              'peak_rss_mb': peak_rss_mb()}
+    if kind == 'render':
+        result['bytes'] = written
+        result['bytes_per_s'] = written / best if best else None
+    return result
+
+# run_suite runs every case matching filters (substrings of the case name)
+# and returns the results keyed by case name.
+def run_suite(quick=False, filters=(), repeat=3, max_cells=10**8, max_render_cells=10**7):
+    results = {}
+    selected = [c for c in cases(quick, max_cells, max_render_cells)
+                if not filters or any(f in c[0] for f in filters)]
+    ctx = mp.get_context('spawn')
+    for i, (name, kind, params) in enumerate(selected):
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_case, (kind, params, repeat))
+        results[name] = result
+        line = f"[{i + 1}/{len(selected)}] {name}: {result['seconds']:.4f}s"
+        if result['cells_per_s']:
+            line += f", {result['cells_per_s']:.3e} cells/s"
+        if result.get('bytes_per_s'):
+            line += f", {result['bytes_per_s'] / 2**20:.1f} MB/s written"
+        if result['peak_rss_mb'] is not None:
+            line += f", peak RSS {result['peak_rss_mb']:.0f} MB"
+        print(line)
+    return results
+
+# compare returns the regressions of new against base: cases whose
+# throughput fell, or whose peak RSS grew, by more than threshold (a
+# fraction), as (name, metric, base value, new value) tuples.
+def compare(base, new, threshold=0.1):
+    regressions = []
+    for name, result in new['results'].items():
+        old = base['results'].get(name)
+        if old is None:
+            continue
+        for metric in ('cells_per_s', 'bytes_per_s'):
+            if old.get(metric) and result.get(metric) is not None and \
+                    result[metric] < old[metric] * (1 - threshold):
+                regressions.append((name, metric, old[metric], result[metric]))
+        if old['peak_rss_mb'] and result['peak_rss_mb'] is not None and \
+                result['peak_rss_mb'] > old['peak_rss_mb'] * (1 + threshold):
+            regressions.append((name, 'peak_rss_mb', old['peak_rss_mb'], result['peak_rss_mb']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Elementary Cellular Automaton Benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the benchmark matrix and save a JSON baseline')
+    run.add_argument('--output', type=str, default='eca_benchmark.json', help='Baseline file to write')
+    run.add_argument('--quick', action='store_true', help='Run the small matrix only')
+    run.add_argument('--filter', type=str, action='append', default=[],
+                     help='Only run cases whose name contains this (repeatable), e.g. sim/packed')
+    run.add_argument('--repeat', type=int, default=3, help='Runs per case, best time kept (default: 3)')
+    run.add_argument('--max-cells', type=float, default=1e8,
+                     help='Skip simulations of more cells than this (default: 1e8)')
+    run.add_argument('--max-render-cells', type=float, default=1e7,
+                     help='Skip renders of more cells than this (default: 1e7)')
+
+    cmp = commands.add_parser('compare', help='Flag regressions of a run against a baseline')
+    cmp.add_argument('baseline', type=str, help='Baseline JSON file')
+    cmp.add_argument('current', type=str, help='JSON file of the run to check')
+    cmp.add_argument('--threshold', type=float, default=0.1,
+                     help='Fractional slowdown or RSS growth counted as a regression (default: 0.1)')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_suite(args.quick, args.filter, args.repeat,
+                            int(args.max_cells), int(args.max_render_cells))
+        baseline = {'meta': {'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                             'python': platform.python_version(), 'numpy': np.__version__,
+                             'platform': platform.platform(), 'processor': platform.processor(),
+                             'cpus': os.cpu_count()},
+                    'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(baseline, f, indent=1)
+        print(f"\n{len(results)} results saved to {args.output}")
+
+    else:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        with open(args.current) as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        shared = len(set(base['results']) & set(new['results']))
+        for name, metric, old, value in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.4g} -> {value:.4g} "
+                  f"({(value - old) / old:+.1%})")
+        print(f"{len(regressions)} regressions in {shared} cases compared "
+              f"(threshold {args.threshold:.0%})")
+        if regressions:
+            sys.exit(1)
+
+# If invoked as a script
+if __name__ == "__main__":
+    main()
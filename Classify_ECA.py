@@ -0,0 +1,366 @@
+# Bulk classification of elementary cellular automaton rules into
+# Wolfram's classes. Every rule is run from the same random initial
+# states, all the runs of all the rules stepped together as one batch of
+# packed words, and each run is watched as it goes and dropped from the
+# batch as soon as it is decided:
+#
+#   I    the run reaches a uniform state or a cycle of uniform states
+#   II   it reaches a fixed point, a cycle, or a pattern that repeats
+#        shifted, by up to p cells every p generations for small p
+#   III  it is saturated: the damage from flipping one cell spreads
+#        steadily across the lattice and its block entropy is near that
+#        of random cells of its density
+#   IV   none of the above by the last generation
+#
+# A rule's class is the one most of its runs fall into, and the rules are
+# ranked from the most complex down. Runs are under the periodic boundary;
+# under the null one every run dies out.
+
+import ECA as eca
+import ECA_ensemble
+import Generate_ECA as generate
+import numpy as np
+import argparse
+import csv
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+CLASSES = ('I', 'II', 'III', 'IV')
+RUN_FIELDS = ('rule', 'init', 'class', 'reason', 'generations', 'transient', 'period',
+              'density', 'entropy', 'spread')
+RULE_FIELDS = ('rank', 'rule', 'class', 'I', 'II', 'III', 'IV', 'generations', 'period',
+               'density', 'entropy', 'spread')
+
+# Longest period, and farthest turn, of the shifting patterns looked for
+MAX_SHIFT = 4
+
+# initial_states returns the shared batch of count random states.
+def initial_states(count, width, density=0.5, seed=0):
+    return np.array([generate.random_state(width, density, seed + i) for i in range(count)],
+                    dtype=np.uint8).reshape(count, width)
+
+# block_entropy returns the Shannon entropy, in bits, of the k-cell
+# blocks of each row of a (B, words) batch of packed periodic rows. Each
+# block is counted on the packed words: the cells starting a block
+# matching it are the AND of the row shifted by 0 to k - 1 cells, each
+# inverted where the block has a 0.
+def block_entropy(words, width, k=3):
+    shifted = [words]
+    for j in range(1, k):
+        shifted.append(eca.neighbors_packed(shifted[-1], width, 'periodic')[1])
+    p = np.zeros((len(words), 1 << k))
+    for block in range(1 << k):
+        match = None
+        for j, row in enumerate(shifted):
+            cells = row if block >> (k - 1 - j) & 1 else ~row
+            match = cells.copy() if match is None else match & cells
+        p[:, block] = eca.count_cells(eca.mask_packed(match, width, 'periodic'))
+    p /= width
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -np.sum(np.where(p > 0, p * np.log2(p), 0), axis=1)
+
+# Multiplier mixing each word into a row hash
+_HASH_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+# row_hashes returns a 64 bit hash of each row of a (B, words) batch of
+# packed generations. Runs are compared by hash alone; a false match in
+# a 1000 generation run of even a million runs is about a one in 10^7
+# chance.
+def row_hashes(words):
+    h = np.zeros(len(words), dtype=np.uint64)
+    for j in range(words.shape[1]):
+        h = (h ^ words[:, j]) * _HASH_MULT
+        h ^= h >> np.uint64(31)
+    return h
+
+# classify_batch runs every rule in rules from every state in the
+# (B, width) batch states, stepping all the runs together, for at most N
+# generations, and returns a dict of RUN_FIELDS per run, rule by rule.
+# Each run has a twin with its middle cell flipped. A run is saturated,
+# class III, once it has gone window generations and the damage, the
+# cells where it and its twin differ, spreads at least spread cells a
+# generation each way without slowing down, and its block entropy is at
+# least saturation of the most cells of its density could have.
+def classify_batch(rules, states, N=1000, window=64, block_size=3, saturation=0.8, spread=0.5):
+    start = ECA_ensemble.as_batch(states)
+    count, width = start.shape
+    rule_of = np.repeat(np.asarray(rules, dtype=np.int64), count)
+    total = len(rule_of)
+    cells = np.tile(start, (len(rules), 1))
+    twin = cells.copy()
+    twin[:, width // 2] ^= 1
+    # Runs and their twins are stepped as one batch, runs first
+    words = eca.pack_cells(np.concatenate([cells, twin]))
+    engine = ECA_ensemble.MixedECA(np.concatenate([rule_of, rule_of]))
+    live = np.arange(total)
+    entropy = np.zeros((window, total))
+    entropy[0] = block_entropy(words[:total], width, block_size)
+    density = eca.count_cells(words[:total]) / width
+    # The hash and damage span of every generation so far, grown as needed.
+    # Spans are only needed, and measured, from halfway through the window.
+    hashes = np.zeros((total, min(N, 64)), dtype=np.uint64)
+    hashes[:, 0] = row_hashes(words[:total])
+    spans = np.zeros((total, min(N, 64)), dtype=np.int64)
+    measured = (window - 1) // 2
+
+    outcome = {'class': np.full(total, 'IV', dtype=object),
+               'reason': np.full(total, 'unsettled', dtype=object),
+               'generations': np.full(total, N), 'transient': np.full(total, None, dtype=object),
+               'period': np.full(total, None, dtype=object), 'density': np.zeros(total),
+               'entropy': np.zeros(total), 'spread': np.full(total, None, dtype=object)}
+
+    def finish(which, x, cls, reason, transient=None, period=None):
+        ids = live[which]
+        outcome['class'][ids] = cls
+        outcome['reason'][ids] = reason
+        outcome['generations'][ids] = x + 1
+        if transient is not None:
+            outcome['transient'][ids] = transient[which]
+            outcome['period'][ids] = period[which]
+        outcome['density'][ids] = density[which]
+        outcome['entropy'][ids] = entropy[:min(x + 1, window), which].mean(axis=0)
+        if x and x >= measured:
+            outcome['spread'][ids] = spans[which, x] / (2 * x)
+
+    recent = [words[:total]]
+    x = 0
+    for x in range(1, N):
+        n = len(live)
+        words = engine.step_packed(words, width, 'periodic', x)
+        current, twins = words[:n], words[n:]
+        entropy[x % window] = block_entropy(current, width, block_size)
+        if x == hashes.shape[1]:
+            hashes = np.concatenate([hashes, np.zeros_like(hashes)], axis=1)
+            spans = np.concatenate([spans, np.zeros_like(spans)], axis=1)
+        if x >= measured:
+            spans[:, x] = damage_spans(eca.unpack_cells(current ^ twins, width))
+        h = row_hashes(current)
+        match = hashes[:, :x] == h[:, None]
+        hashes[:, x] = h
+
+        cycled = match.any(axis=1)
+        first = np.argmax(match, axis=1)
+        live_cells = eca.count_cells(current)
+        density = live_cells / width
+        uniform = (live_cells == 0) | (live_cells == width)
+        # The shortest p for which generation x is generation x - p turned
+        # by at most p cells
+        turns = [(current, current)]
+        for _ in range(min(MAX_SHIFT, x)):
+            left, right = turns[-1]
+            turns.append((eca.mask_packed(eca.neighbors_packed(left, width, 'periodic')[0],
+                                          width, 'periodic'),
+                          eca.mask_packed(eca.neighbors_packed(right, width, 'periodic')[1],
+                                          width, 'periodic')))
+        shift = np.zeros(n, dtype=np.int64)
+        for p, old in enumerate(recent, 1):
+            for left, right in turns[1:p + 1]:
+                hit = np.all(left == old, axis=1) | np.all(right == old, axis=1)
+                shift[(shift == 0) & hit] = p
+        shifted = ~uniform & ~cycled & (shift > 0)
+        if x + 1 >= window:
+            ceiling = block_size * binary_entropy(density)
+            saturated = (~cycled & ~shifted & (spans[:, x] >= spread * 2 * x) &
+                         (spans[:, x] >= 1.8 * spans[:, x // 2]) &
+                         (entropy.mean(axis=0) >= saturation * ceiling))
+        else:
+            saturated = np.zeros(n, dtype=bool)
+
+        # A cycle through a uniform state only holds uniform states
+        period = x - first
+        finish(cycled & uniform, x, 'I', 'uniform', first, period)
+        finish(cycled & ~uniform & (period == 1), x, 'II', 'fixed', first, period)
+        finish(cycled & ~uniform & (period > 1), x, 'II', 'cycle', first, period)
+        finish(shifted, x, 'II', 'shift', x - shift, shift)
+        finish(saturated, x, 'III', 'saturated')
+
+        recent = [current] + recent[:MAX_SHIFT - 1]
+        done = cycled | shifted | saturated
+        if done.any():
+            keep = ~done
+            live, density = live[keep], density[keep]
+            recent = [old[keep] for old in recent]
+            words = words[np.concatenate([keep, keep])]
+            engine = engine.select(np.concatenate([keep, keep]))
+            entropy, hashes, spans = entropy[:, keep], hashes[keep], spans[keep]
+            if not len(live):
+                break
+    finish(np.ones(len(live), dtype=bool), x, 'IV', 'unsettled')
+
+    runs = []
+    for i in range(total):
+        run = {name: values[i] for name, values in outcome.items()}
+        run.update(rule=int(rule_of[i]), init=i % count)
+        for name in ('generations', 'transient', 'period'):
+            if run[name] is not None:
+                run[name] = int(run[name])
+        for name in ('density', 'entropy', 'spread'):
+            if run[name] is not None:
+                run[name] = float(run[name])
+        runs.append(run)
+    return runs
+
+# damage_spans returns the length of the shortest arc of each row of a
+# (B, width) batch of periodic rows holding all its 1s, 0 if there are
+# none, so damage drifting around the lattice isn't taken for spreading.
+def damage_spans(damage):
+    width = damage.shape[1]
+    spans = np.zeros(len(damage), dtype=np.int64)
+    rows, cols = np.nonzero(damage)
+    if not len(rows):
+        return spans
+    # Gaps from each 1 to the next in its row, the last wrapping round to
+    # the first
+    starts = np.flatnonzero(np.diff(rows, prepend=-1))
+    ends = np.append(starts[1:], len(rows)) - 1
+    gaps = np.diff(cols, append=0)
+    gaps[ends] = cols[starts] + width - cols[ends]
+    spans[rows[starts]] = width + 1 - np.maximum.reduceat(gaps, starts)
+    return spans
+
+# binary_entropy returns the entropy, in bits, of a cell that is 1 with
+# probability p.
+def binary_entropy(p):
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+
+def _classify_job(job):
+    return classify_batch(*job)
+
+# classify_rules classifies every rule in rules from the batch states,
+# splitting the rules between processes worker processes, and returns
+# the run records.
+def classify_rules(rules, states, N=1000, window=64, block_size=3, saturation=0.8, spread=0.5,
+                   processes=None):
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(rules) == 1:
+        return classify_batch(rules, states, N, window, block_size, saturation, spread)
+    jobs = [(list(part), states, N, window, block_size, saturation, spread)
+            for part in np.array_split(rules, min(processes, len(rules)))]
+    runs = []
+    with Pool(processes) as pool:
+        for part_runs in pool.imap(_classify_job, jobs):
+            runs.extend(part_runs)
+    return runs
+
+# rank_rules sums up the runs of each rule: its class, the share of its
+# runs in each class, and the mean generations run, period, final
+# density, entropy and damage spreading speed (of the runs it was
+# measured for). Rules are ranked by class, most complex first, then by
+# the share of runs in that class and the generations they took.
+def rank_rules(runs):
+    by_rule = {}
+    for run in runs:
+        by_rule.setdefault(run['rule'], []).append(run)
+    table = []
+    for rule, rule_runs in by_rule.items():
+        shares = {c: sum(r['class'] == c for r in rule_runs) / len(rule_runs) for c in CLASSES}
+        # Ties go to the more complex class
+        cls = max(reversed(CLASSES), key=lambda c: shares[c])
+        periods = [r['period'] for r in rule_runs if r['period']]
+        spreads = [r['spread'] for r in rule_runs if r['spread'] is not None]
+        table.append(dict(shares, rule=rule, **{'class': cls},
+                          generations=np.mean([r['generations'] for r in rule_runs]),
+                          period=float(np.median(periods)) if periods else None,
+                          density=np.mean([r['density'] for r in rule_runs]),
+                          entropy=np.mean([r['entropy'] for r in rule_runs]),
+                          spread=float(np.mean(spreads)) if spreads else None))
+    table.sort(key=lambda t: (-CLASSES.index(t['class']), -t[t['class']], -t['generations'],
+                              t['rule']))
+    for rank, row in enumerate(table, 1):
+        row['rank'] = rank
+    return table
+
+# write_csv writes rows of dicts with the given fields to path.
+def write_csv(path, fields, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+# print_table prints the ranked rules, the first top of them if given.
+def print_table(table, top=None):
+    print(f"{'rank':>4} {'rule':>4} {'class':>5}   {'I':>5} {'II':>5} {'III':>5} {'IV':>5}"
+          f" {'gens':>7} {'period':>6} {'density':>7} {'entropy':>7} {'spread':>6}")
+    for row in table[:top]:
+        period = f"{row['period']:6.0f}" if row['period'] else f"{'-':>6}"
+        spread = f"{row['spread']:6.2f}" if row['spread'] is not None else f"{'-':>6}"
+        print(f"{row['rank']:4d} {row['rule']:4d} {row['class']:>5}   "
+              f"{row['I']:5.0%} {row['II']:5.0%} {row['III']:5.0%} {row['IV']:5.0%}"
+              f" {row['generations']:7.1f} {period} {row['density']:7.3f} {row['entropy']:7.3f}"
+              f" {spread}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Elementary Cellular Automaton Rule Classifier')
+    parser.add_argument('--rules', type=str, default='0-255',
+                        help='Rules to classify, e.g. 0-255 or 30,90,110 (default: 0-255)')
+    parser.add_argument('--inits', type=int, default=64,
+                        help='Random initial states each rule is run from (default: 64)')
+    parser.add_argument('--width', type=int, default=200,
+                        help='Lattice width, at least twice --window (default: 200)')
+    parser.add_argument('--generations', type=int, default=1000,
+                        help='Longest a run may go before it is called class IV (default: 1000)')
+    parser.add_argument('--density', type=float, default=0.5,
+                        help='Probability of a 1 in the initial states (default: 0.5)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first initial state (default: 0)')
+    parser.add_argument('--window', type=int, default=64,
+                        help='Generations a run goes before it can be called class III (default: 64)')
+    parser.add_argument('--block-size', type=int, default=3,
+                        help='Block length the entropy is measured over (default: 3)')
+    parser.add_argument('--saturation', type=float, default=0.8,
+                        help='Fraction of the largest block entropy for its density a class III '
+                             'run needs (default: 0.8)')
+    parser.add_argument('--spread', type=float, default=0.5,
+                        help='Cells a generation the damage of a class III run spreads each way '
+                             '(default: 0.5)')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--top', type=int, help='Only print the first TOP rules of the table')
+    parser.add_argument('--output', type=str, help='Write the ranked table to a CSV file')
+    parser.add_argument('--runs', type=str, help='Write the outcome of every run to a CSV file')
+    args = parser.parse_args()
+
+    try:
+        rules = generate.parse_rules(args.rules)
+    except ValueError:
+        print("Error: --rules must look like 0-255 or 30,90,110")
+        sys.exit(1)
+    if not all(0 <= rule <= 255 for rule in rules):
+        print("Error: Rule must be between 0 and 255.")
+        sys.exit(1)
+    if args.inits < 1 or args.generations < 2 or args.window < 1 or args.block_size < 1:
+        print("Error: --inits, --window and --block-size must be at least 1 and "
+              "--generations at least 2")
+        sys.exit(1)
+    if args.width < max(2 * args.window, args.block_size):
+        print("Error: --width must be at least twice --window, so damage can spread that long")
+        sys.exit(1)
+    if not 0 <= args.density <= 1:
+        print("Error: --density must be between 0 and 1")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    states = initial_states(args.inits, args.width, args.density, args.seed)
+    runs = classify_rules(rules, states, args.generations, args.window, args.block_size,
+                          args.saturation, args.spread, args.processes)
+    elapsed = time.perf_counter() - start
+    table = rank_rules(runs)
+    print_table(table, args.top)
+
+    computed = sum(run['generations'] for run in runs)
+    full = len(runs) * args.generations
+    print(f"\nClassified {len(rules)} rules x {args.inits} inits in {elapsed:.2f}s, "
+          f"{computed:,} of {full:,} generations ({computed / full:.1%} of full runs)")
+    counts = {c: sum(row['class'] == c for row in table) for c in CLASSES}
+    print("Rules per class: " + ", ".join(f"{c} {n}" for c, n in counts.items()))
+    if args.output:
+        write_csv(args.output, RULE_FIELDS, table)
+        print(f"Ranked table saved to {args.output}")
+    if args.runs:
+        write_csv(args.runs, RUN_FIELDS, runs)
+        print(f"Runs saved to {args.runs}")
+
+# If invoked as a script
+if __name__ == "__main__":
+    main()
@@ -5,41 +5,440 @@
 
 # 2022 William Kephart
 
+import functools
 import numpy as np
 
+_WORD = (1 << 64) - 1
+
+# Generations advanced per table lookup by state_at for rules without an
+# algebraic jump.
+SUPERSTEP = 4
+
+# compile_rule turns a rule number 0-255, or its 8 digit binary string,
+# into the rule string and its lookup table, table[i] being the child of
+# the neighborhood whose 3 bit binary value is i. Compiled rules are
+# cached, least recently used first out.
+@functools.lru_cache(maxsize=256)
+def compile_rule(rule):
+    if isinstance(rule, str):
+        if len(rule) != 8 or set(rule) - set('01'):
+            raise ValueError(f"rule string must be 8 binary digits: {rule!r}")
+        number = int(rule, 2)
+    else:
+        number = int(rule)
+        if not (0 <= number <= 255):
+            raise ValueError(f"rule must be between 0 and 255: {rule!r}")
+    table = np.array([(number >> i) & 1 for i in range(8)], dtype=np.uint8)
+    table.flags.writeable = False
+    return f"{number:08b}", table
+
+# superstep_table returns the table mapping each (2k + 1)-cell window,
+# read as a binary number with its leftmost cell highest, to the window's
+# centre cell k generations on. Tables are cached like compile_rule's.
+@functools.lru_cache(maxsize=64)
+def superstep_table(rule, k):
+    table = compile_rule(rule)[1]
+    size = 2 * k + 1
+    windows = np.arange(1 << size)
+    cells = ((windows[:, None] >> np.arange(size - 1, -1, -1)) & 1).astype(np.uint8)
+    for x in range(k):
+        cells = table[cells[:, :-2] << 2 | cells[:, 1:-1] << 1 | cells[:, 2:]]
+    table = cells[:, 0].copy()
+    table.flags.writeable = False
+    return table
+
+# as_cells converts a binary string (or any sequence of 0s and 1s) into
+# a uint8 cell array. Arrays are passed through without copying.
+def as_cells(state):
+    if isinstance(state, str):
+        return np.frombuffer(state.encode('ascii'), 'u1') - ord('0')
+    return np.asarray(state, dtype=np.uint8)
+
 class ECA:
     def __init__(self, rule):
-        self.rule = rule
+        # rule may be a number 0-255 or its 8 digit binary string
+        self.rule, self.table = compile_rule(rule)
+        self.number = int(self.rule, 2)
+        # Moebius transform of the truth table gives the rule's algebraic
+        # normal form. Term m ANDs together L (bit 2), C (bit 1) and R
+        # (bit 0); term 0 is the constant 1 and is applied as a NOT.
+        anf = [int(v) for v in self.table]
+        for i in range(3):
+            for m in range(8):
+                if m & (1 << i):
+                    anf[m] ^= anf[m ^ (1 << i)]
+        self.terms = [m for m in range(1, 8) if anf[m]]
+        self.invert = bool(anf[0])
+        # Additive rules (60, 90, 102, 150, their complements, ...) XOR
+        # single neighbors together, so they are linear over GF(2).
+        self.additive = all(m in (1, 2, 4) for m in self.terms)
 
     # cellEvo takes as input an ECA and a 3 digit string of a cell and its
     # neighbors and outputs a single 0 or 1 according to the given rule.
     def cellEvo(self, neighborhood):
         return self.rule[7 - int(neighborhood, 2)]
 
-    # timestep takes an ECA, an input state, and 
+    # step takes a uint8 cell array and a boundary condition and returns
+    # the child cell array. Neighborhood indices are built from shifted
+    # copies of the parent and looked up in the rule table all at once.
+    # If out is given the child is written into it.
+    def step(self, cells, b_cond, out=None):
+        if (b_cond=='null'):
+            idx = cells[:-2] << 2
+            idx |= cells[1:-1] << 1
+            idx |= cells[2:]
+        elif (b_cond=='periodic'):
+            idx = np.roll(cells, 1) << 2
+            idx |= cells << 1
+            idx |= np.roll(cells, -1)
+        else:
+            raise ValueError(f"unknown boundary condition: {b_cond!r}")
+        return np.take(self.table, idx, out=out)
+
+    # superstep advances cells k generations with a single lookup per cell
+    # in superstep_table. Under the null boundary the result is k cells
+    # narrower on each side, as after k calls to step.
+    def superstep(self, cells, b_cond, k):
+        table = superstep_table(self.number, k)
+        dtype = np.uint16 if 2 * k + 1 <= 16 else np.uint32
+        if (b_cond=='null'):
+            width = max(len(cells) - 2 * k, 0)
+            idx = np.zeros(width, dtype=dtype)
+            for d in range(2 * k + 1):
+                idx <<= 1
+                idx |= cells[d:d+width]
+        elif (b_cond=='periodic'):
+            idx = np.zeros(len(cells), dtype=dtype)
+            for d in range(-k, k + 1):
+                idx <<= 1
+                idx |= np.roll(cells, -d)
+        else:
+            raise ValueError(f"unknown boundary condition: {b_cond!r}")
+        return table[idx]
+
+    # timestep takes an ECA, an input state, and
     # a boundary condition and outputs a child state.
     def timestep(self, state, b_cond):
-        cell_arr = []
-        
+        child = self.step(as_cells(state), b_cond) + ord('0')
+        return child.tobytes().decode('ascii')
+
+    # spacetime runs an ECA for N generations and writes them straight into
+    # a preallocated (N, width) uint8 array. Under the null boundary every
+    # generation is two cells narrower than its parent, so generation x
+    # occupies columns x to width - x and the rest of the row is left 0.
+    #
+    # Under the periodic boundary cycle='stop' or cycle='tile' watches for
+    # the first repeated generation. 'stop' returns the run up to the end
+    # of its first cycle, 'tile' fills the remaining rows by repeating the
+    # cycle instead of computing them. Either way self.cycle is set to
+    # (transient, period), or None if no generation repeated.
+    def spacetime(self, state, b_cond, N, cycle=None):
+        cells = as_cells(state)
+        width = len(cells)
+        gens = np.zeros((N, width), dtype=np.uint8)
+        seen = _cycle_start(self, b_cond, cycle)
+        if N == 0:
+            return gens
+        gens[0] = cells
+        if cycle:
+            _cycle_found(self, gens, 0, seen)
+        for x in range(1, N):
+            if (b_cond=='null'):
+                if width - x <= x:
+                    break
+                self.step(gens[x-1, x-1:width-x+1], b_cond, out=gens[x, x:width-x])
+            else:
+                self.step(gens[x-1], b_cond, out=gens[x])
+            if cycle and _cycle_found(self, gens, x, seen):
+                return _cycle_finish(self, gens, x, cycle)
+        return gens
+
+    # N_Gens runs an ECA for N generations.
+    def N_Gens(self, state, b_cond, N, cycle=None):
+        gens = self.spacetime(state, b_cond, N, cycle)
         if (b_cond=='null'):
-            for x in range(len(state)-2):
-                cell_arr.append(self.cellEvo(state[x:x+3]))
-        elif (b_cond=='periodic'):
-            y = len(state)
-            cell_arr.append(self.cellEvo(state[y-1] + state[:2]))
-            for x in range(y-2):
-                cell_arr.append(self.cellEvo(state[x:x+3]))
-            cell_arr.append(self.cellEvo(state[y-2:y] + state[0]))
-                
-        child_state = ''.join(cell_arr)
-        return child_state
-
-    # N_Gens runs an ECA for N generations.                                     
-    def N_Gens(self, state, b_cond, N):
-        current_state = state
-        gen_arr = []
-        for x in range(N):
-            gen = np.frombuffer(current_state.encode('ascii'),'u1') - ord('0')
-            gen_arr.append(gen)
-            current_state = self.timestep(current_state, b_cond)
-        return gen_arr
+            width = gens.shape[1]
+            return [gens[x, x:width-x] for x in range(len(gens))]
+        return list(gens)
+
+    # state_at returns generation N of a run, the row N_Gens(state, b_cond,
+    # N + 1) would end with. Additive rules jump straight there; any other
+    # rule advances SUPERSTEP generations per table lookup.
+    def state_at(self, state, b_cond, N):
+        cells = as_cells(state)
+        if self.additive:
+            return self._additive_state_at(cells, b_cond, N)
+        supersteps, steps = divmod(N, SUPERSTEP)
+        for x in range(supersteps):
+            cells = self.superstep(cells, b_cond, SUPERSTEP)
+        for x in range(steps):
+            cells = self.step(cells, b_cond)
+        return cells
+
+    # _additive_state_at jumps an additive rule N generations in
+    # O(width log N). Squaring the rule's polynomial over GF(2) spreads its
+    # neighbors apart, so 2^j generations are one step with the left and
+    # right neighbors 2^j cells away, and N takes one such step per set bit.
+    # The state is held as a Python int, cell i in bit i, so each step is
+    # a few shifts and XORs over the packed bits. A complemented rule adds
+    # the all-ones state to each step; summed over N steps that is one
+    # final NOT when it has an even number of terms, or when N is odd.
+    def _additive_state_at(self, cells, b_cond, N):
+        if b_cond not in ('null', 'periodic'):
+            raise ValueError(f"unknown boundary condition: {b_cond!r}")
+        width = len(cells)
+        if (b_cond=='null'):
+            width = max(width - 2 * N, 0)
+        if width == 0:
+            return np.zeros(0, dtype=np.uint8)
+        x = int.from_bytes(np.packbits(cells, bitorder='little').tobytes(), 'little')
+        n = len(cells)
+        mask = (1 << n) - 1
+        for j in range(N.bit_length()):
+            if not N >> j & 1:
+                continue
+            t = 1 << j
+            y = 0
+            if (b_cond=='null'):
+                # Output cell i sits over input cell i + t
+                n -= 2 * t
+                if 4 in self.terms:
+                    y ^= x
+                if 2 in self.terms:
+                    y ^= x >> t
+                if 1 in self.terms:
+                    y ^= x >> 2 * t
+                mask = (1 << n) - 1
+            else:
+                t %= n
+                if 4 in self.terms:
+                    y ^= (x << t | x >> (n - t)) & mask
+                if 2 in self.terms:
+                    y ^= x
+                if 1 in self.terms:
+                    y ^= x >> t | x << (n - t)
+            x = y & mask
+        if self.invert and N and (len(self.terms) % 2 == 0 or N % 2):
+            x ^= mask
+        data = np.frombuffer(x.to_bytes((width + 7) // 8, 'little'), dtype=np.uint8)
+        return np.unpackbits(data, count=width, bitorder='little')
+
+    # iter_gens runs an ECA one generation at a time and yields each
+    # generation as soon as it exists, so only the current state is held
+    # in memory. With N=None it runs until the consumer stops, or under the
+    # null boundary until the state has shrunk away.
+    def iter_gens(self, state, b_cond, N=None):
+        cells = as_cells(state)
+        x = 0
+        while N is None or x < N:
+            if N is None and len(cells) == 0:
+                return
+            yield cells
+            x += 1
+            cells = self.step(cells, b_cond)
+
+# _cycle_start resets eca.cycle for a run and returns the empty hash
+# index used to spot repeated generations.
+def _cycle_start(eca, b_cond, cycle):
+    eca.cycle = None
+    if cycle not in (None, 'stop', 'tile'):
+        raise ValueError(f"unknown cycle mode: {cycle!r}")
+    if cycle and b_cond != 'periodic':
+        raise ValueError("cycle detection needs the periodic boundary")
+    return {}
+
+# _cycle_found looks generation x up in the hash index seen, comparing it
+# against the stored generations with a matching hash. On a repeat it
+# records (transient, period) in eca.cycle and returns True; otherwise
+# generation x is added to the index.
+def _cycle_found(eca, gens, x, seen):
+    key = hash(gens[x].tobytes())
+    for t in seen.setdefault(key, []):
+        if np.array_equal(gens[t], gens[x]):
+            eca.cycle = (t, x - t)
+            return True
+    seen[key].append(x)
+    return False
+
+# _cycle_finish ends a run whose generation x repeats an earlier one,
+# either truncating it or tiling the cycle over the remaining rows a
+# period at a time.
+def _cycle_finish(eca, gens, x, cycle):
+    if cycle == 'stop':
+        return gens[:x]
+    period = eca.cycle[1]
+    for y in range(x, len(gens), period):
+        end = min(y + period, len(gens))
+        gens[y:end] = gens[y-period:end-period]
+    return gens
+
+# pack_cells packs a uint8 cell array into little-endian uint64 words,
+# 64 cells per word with cell i in bit i % 64 of word i // 64. Padding
+# bits past the end of the state are 0. A 2D array is packed row by row.
+def pack_cells(cells):
+    cells = np.asarray(cells)
+    nwords = (cells.shape[-1] + 63) // 64
+    buf = np.zeros(cells.shape[:-1] + (nwords * 8,), dtype=np.uint8)
+    packed = np.packbits(cells, axis=-1, bitorder='little')
+    buf[..., :packed.shape[-1]] = packed
+    return buf.view('<u8')
+
+# unpack_cells is the inverse of pack_cells. It works on a single row of
+# words or on a 2D array with one packed generation per row.
+def unpack_cells(words, width):
+    words = np.ascontiguousarray(words, dtype='<u8')
+    return np.unpackbits(words.view(np.uint8), axis=-1, count=width, bitorder='little')
+
+# Number of 1 bits in each byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# count_cells returns the number of live cells in packed words, summed
+# over the last axis.
+def count_cells(words):
+    words = np.ascontiguousarray(words, dtype='<u8')
+    return _POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+# neighbors_packed returns the packed left and right neighbors of every
+# cell of packed words of the given width, wrapping round under the
+# periodic boundary and reading 0 past the ends under the null one.
+def neighbors_packed(words, width, b_cond):
+    left = words << np.uint64(1)
+    left[..., 1:] |= words[..., :-1] >> np.uint64(63)
+    right = words >> np.uint64(1)
+    right[..., :-1] |= words[..., 1:] << np.uint64(63)
+    last = width - 1
+    if (b_cond=='periodic'):
+        left[..., 0] |= (words[..., last >> 6] >> np.uint64(last & 63)) & np.uint64(1)
+        right[..., last >> 6] |= (words[..., 0] & np.uint64(1)) << np.uint64(last & 63)
+    elif (b_cond!='null'):
+        raise ValueError(f"unknown boundary condition: {b_cond!r}")
+    return left, right
+
+# mask_packed clears the padding bits of packed generation x, or under
+# the null boundary every cell outside its shrinking window, in place,
+# and returns it.
+def mask_packed(out, width, b_cond, x=1):
+    if (b_cond=='null'):
+        lo, hi = x, width - x
+    else:
+        lo, hi = 0, width
+    if hi <= lo:
+        out[:] = 0
+        return out
+    out[..., :lo >> 6] = 0
+    out[..., lo >> 6] &= np.uint64(~((1 << (lo & 63)) - 1) & _WORD)
+    out[..., (hi - 1) >> 6] &= np.uint64((2 << ((hi - 1) & 63)) - 1 & _WORD)
+    out[..., ((hi - 1) >> 6) + 1:] = 0
+    return out
+
+# PackedSpacetime holds the generations of a PackedECA run as an
+# (N, words) uint64 array. It behaves like the list returned by
+# ECA.N_Gens, unpacking a generation only when it is indexed or iterated,
+# so renderers can consume it without the whole run being unpacked.
+# start is the generation number of the first row, for runs that don't
+# begin at generation 0.
+class PackedSpacetime:
+    def __init__(self, words, width, b_cond, start=0):
+        self.words = words
+        self.width = width
+        self.b_cond = b_cond
+        self.start = start
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += len(self.words)
+        row = unpack_cells(self.words[x], self.width)
+        if (self.b_cond=='null'):
+            x += self.start
+            return row[x:self.width-x]
+        return row
+
+    def __iter__(self):
+        for x in range(len(self.words)):
+            yield self[x]
+
+    # unpack returns the whole run as an (N, width) uint8 array laid out
+    # like ECA.spacetime.
+    def unpack(self):
+        return unpack_cells(self.words, self.width)
+
+# PackedECA is an ECA backend that stores each generation bit-packed in
+# uint64 words. The rule is compiled to its algebraic normal form, an XOR
+# of AND terms over the left, center and right neighbors, so every rule
+# evolves 64 cells per word operation.
+class PackedECA(ECA):
+    # step_packed takes a packed generation of the given width and returns
+    # the packed child. Under the null boundary generation x keeps its
+    # cells at columns x to width - x, the same layout ECA.spacetime uses,
+    # so the caller passes x to mask off the two cells that fall away.
+    def step_packed(self, words, width, b_cond, x=1, out=None):
+        left, right = neighbors_packed(words, width, b_cond)
+        if out is None:
+            out = np.zeros_like(words)
+        else:
+            out[:] = 0
+        for m in self.terms:
+            term = None
+            for bit, neighbor in ((4, left), (2, words), (1, right)):
+                if m & bit:
+                    if term is None:
+                        term = neighbor.copy()
+                    else:
+                        term &= neighbor
+            out ^= term
+        if self.invert:
+            np.invert(out, out=out)
+        return mask_packed(out, width, b_cond, x)
+
+    # N_Gens runs an ECA for N generations. With packed=True the run is
+    # returned as a PackedSpacetime instead of a list of uint8 arrays.
+    # cycle works as for ECA.spacetime, comparing packed generations.
+    def N_Gens(self, state, b_cond, N, packed=False, cycle=None):
+        cells = as_cells(state)
+        width = len(cells)
+        gens = np.zeros((N, (width + 63) // 64), dtype='<u8')
+        seen = _cycle_start(self, b_cond, cycle)
+        if N > 0:
+            gens[0] = pack_cells(cells)
+            if cycle:
+                _cycle_found(self, gens, 0, seen)
+        for x in range(1, N):
+            if (b_cond=='null') and width - x <= x:
+                break
+            self.step_packed(gens[x-1], width, b_cond, x, out=gens[x])
+            if cycle and _cycle_found(self, gens, x, seen):
+                gens = _cycle_finish(self, gens, x, cycle)
+                break
+        run = PackedSpacetime(gens, width, b_cond)
+        if packed:
+            return run
+        return list(run)
+
+    # iter_gens yields one generation at a time like ECA.iter_gens. With
+    # packed=True the packed words are yielded instead of unpacked cells.
+    def iter_gens(self, state, b_cond, N=None, packed=False):
+        cells = as_cells(state)
+        width = len(cells)
+        words = pack_cells(cells)
+        x = 0
+        while N is None or x < N:
+            if (b_cond=='null'):
+                lo, hi = x, width - x
+            else:
+                lo, hi = 0, width
+            if N is None and hi <= lo:
+                return
+            if packed:
+                yield words
+            else:
+                yield unpack_cells(words, width)[lo:hi]
+            x += 1
+            words = self.step_packed(words, width, b_cond, x)
+
+    # spacetime runs an ECA for N generations and returns the unpacked
+    # (N, width) uint8 array.
+    def spacetime(self, state, b_cond, N, cycle=None):
+        return self.N_Gens(state, b_cond, N, packed=True, cycle=cycle).unpack()
@@ -0,0 +1,62 @@
+# Content-addressed on-disk cache of elementary cellular automaton runs.
+# Each run is a spacetime store (see ECA_store) named by a hash of its
+# rule, boundary and initial state, so a repeated request is served
+# straight from disk. Runs are cached without their length: a request for
+# fewer generations than are cached reads a prefix of the store, and a
+# request for more resumes the run from its last cached generation.
+# The least recently used runs are evicted once the cache outgrows its
+# size limit.
+
+import hashlib
+import os
+import numpy as np
+import ECA as eca
+import ECA_store
+
+SUFFIX = '.eca'
+
+# run_key returns the hex digest naming a run of rule from state under
+# b_cond.
+def run_key(rule, state, b_cond):
+    cells = eca.as_cells(state)
+    h = hashlib.sha256(f"{eca.ECA(rule).number}:{b_cond}:{len(cells)}:".encode('ascii'))
+    h.update(np.packbits(cells).tobytes())
+    return h.hexdigest()
+
+# SpacetimeCache is a directory of cached runs holding at most max_bytes
+# of stores, apart from the most recently used one, which is always kept.
+class SpacetimeCache:
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    # spacetime returns the first N generations of a run as a
+    # PackedSpacetime, computing only the generations not already cached.
+    def spacetime(self, rule, state, b_cond, N):
+        path = self.path(run_key(rule, state, b_cond))
+        store = ECA_store.record(rule, state, b_cond, N, path)
+        os.utime(path)
+        self.evict(keep=path)
+        return store.spacetime(0, N)
+
+    # evict removes the least recently used runs until the cache fits in
+    # max_bytes, never removing keep.
+    def evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
@@ -0,0 +1,104 @@
+# Batched evolution of an ensemble of elementary cellular automaton runs.
+# B initial states of the same width are held as a (B, words) array of
+# packed generations, so each generation of every run is computed by the
+# same handful of whole-array word operations and the interpreter overhead
+# of a step is shared across the ensemble.
+
+import numpy as np
+import ECA as eca
+
+# as_batch returns states, a (B, width) array or a list of equal-width
+# states (binary strings or cell arrays), as a (B, width) uint8 array.
+def as_batch(states):
+    if isinstance(states, np.ndarray):
+        return np.atleast_2d(states).astype(np.uint8, copy=False)
+    return np.array([eca.as_cells(s) for s in states], dtype=np.uint8).reshape(len(states), -1)
+
+# EnsembleECA runs one rule from many initial states at once. Every
+# method takes a (B, width) batch of states and returns results with the
+# run along the first axis, matching what ECA would give for each state.
+class EnsembleECA(eca.PackedECA):
+    # iter_batch yields generations 0 to N - 1 of every run as (B, width)
+    # uint8 arrays, each generation as ECA.iter_gens would give it. With
+    # packed=True the (B, words) packed generations are yielded instead.
+    def iter_batch(self, states, b_cond, N, packed=False):
+        cells = as_batch(states)
+        width = cells.shape[1]
+        words = eca.pack_cells(cells)
+        for x in range(N):
+            if x:
+                words = self.step_packed(words, width, b_cond, x)
+            if packed:
+                yield words
+            elif (b_cond=='null'):
+                yield eca.unpack_cells(words, width)[:, x:max(width - x, x)]
+            else:
+                yield eca.unpack_cells(words, width)
+
+    # spacetime returns the runs as a (B, N, width) uint8 array, each run
+    # laid out like ECA.spacetime.
+    def spacetime(self, states, b_cond, N):
+        cells = as_batch(states)
+        out = np.zeros((len(cells), N, cells.shape[1]), dtype=np.uint8)
+        for x, words in enumerate(self.iter_batch(cells, b_cond, N, packed=True)):
+            out[:, x] = eca.unpack_cells(words, cells.shape[1])
+        return out
+
+    # last_gen returns generation N - 1 of every run, the row N_Gens would
+    # end with, without keeping the rest of the runs. N must be at least 1.
+    def last_gen(self, states, b_cond, N):
+        if N < 1:
+            raise ValueError("last_gen needs at least one generation")
+        cells = as_batch(states)
+        width = cells.shape[1]
+        for words in self.iter_batch(cells, b_cond, N, packed=True):
+            pass
+        gen = eca.unpack_cells(words, width)
+        if (b_cond=='null'):
+            x = N - 1
+            return gen[:, x:max(width - x, x)]
+        return gen
+
+    # densities returns the (B, N) fraction of live cells in each
+    # generation of each run, counted on the packed words. Under the null
+    # boundary the fraction is of the cells still in generation x.
+    def densities(self, states, b_cond, N):
+        cells = as_batch(states)
+        width = cells.shape[1]
+        out = np.zeros((len(cells), N))
+        for x, words in enumerate(self.iter_batch(cells, b_cond, N, packed=True)):
+            size = max(width - 2 * x, 0) if (b_cond=='null') else width
+            if size:
+                out[:, x] = eca.count_cells(words) / size
+        return out
+
+# MixedECA steps a batch of runs that each follow their own rule, rules
+# giving the rule of every run along the first axis, so a whole rule
+# space can be evolved with one set of array operations. A child is the
+# OR of the neighborhood patterns its run's rule maps to 1, each kept or
+# dropped per run by a mask of all 1s or all 0s.
+class MixedECA:
+    def __init__(self, rules):
+        self.rules = np.asarray(rules, dtype=np.int64)
+        bits = (self.rules[:, None] >> np.arange(8)) & 1
+        self.masks = np.where(bits, np.uint64(eca._WORD), np.uint64(0))
+
+    # select returns the MixedECA of the runs picked by index or mask keep.
+    def select(self, keep):
+        return MixedECA(self.rules[keep])
+
+    # step_packed takes a (B, words) batch of packed generations, one per
+    # rule, and returns their children as PackedECA.step_packed would.
+    def step_packed(self, words, width, b_cond, x=1):
+        left, right = eca.neighbors_packed(words, width, b_cond)
+        neighbors = (left, words, right)
+        out = np.zeros_like(words)
+        for m in range(8):
+            term = np.broadcast_to(self.masks[:, m, None], words.shape).copy()
+            for shift, neighbor in zip((2, 1, 0), neighbors):
+                if m >> shift & 1:
+                    term &= neighbor
+                else:
+                    term &= ~neighbor
+            out |= term
+        return eca.mask_packed(out, width, b_cond, x)
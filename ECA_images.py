@@ -0,0 +1,226 @@
+# Streaming image writers for elementary cellular automata spacetimes.
+# Each writer is given the image size up front and is then fed one row of
+# cells at a time, 1 for a live (black) cell and 0 for a dead (white)
+# one, or a fraction of black between the two for pooled rows. Every row
+# goes out as a single buffer write, so an image can be written while its
+# generations are still being computed.
+
+import os
+import re
+import struct
+import zlib
+import numpy as np
+
+NETPBM_MAGIC = {'pbm': 'P4', 'pgm': 'P5', 'ppm': 'P6'}
+POOL_METHODS = ('sample', 'mean', 'max', 'min')
+
+# Netpbm heights are right-aligned in a fixed-width field so that rows can
+# be appended later and the height rewritten in place.
+HEIGHT_FIELD = 20
+_NETPBM_HEADER = re.compile(rb'(P[456])\s+(\d+)(\s+)(\d+)\s')
+
+# NetpbmWriter writes binary PBM (P4, 1 bit per pixel), PGM (P5, 1 byte
+# per pixel) or PPM (P6, 3 bytes per pixel) images. With header=False it
+# only writes rows, for appending to an existing image.
+class NetpbmWriter:
+    def __init__(self, f, width, height, magic='P6', header=True):
+        self.f = f
+        self.magic = magic
+        if not header:
+            return
+        header = f"{magic}\n{width} {height:>{HEIGHT_FIELD}}\n"
+        if magic != 'P4':
+            header += "255\n"
+        f.write(header.encode('ascii'))
+
+    def write_row(self, row):
+        row = np.asarray(row)
+        if self.magic == 'P4':
+            # PBM already uses 1 for black, padded to a whole byte per row
+            self.f.write(np.packbits(row >= 0.5).tobytes())
+            return
+        grey = grey_levels(row)
+        if self.magic == 'P6':
+            grey = np.repeat(grey, 3)
+        self.f.write(grey.tobytes())
+
+    def close(self):
+        pass
+
+# grey_levels returns a row of cells as 8 bit grey, 0 for black.
+def grey_levels(row):
+    row = np.asarray(row)
+    if row.dtype.kind == 'f':
+        return (255 - np.rint(255 * row)).astype(np.uint8)
+    return (255 - 255 * row.astype(np.uint8)).astype(np.uint8)
+
+# PNGWriter writes a 1 bit greyscale PNG, or an 8 bit one with depth=8,
+# using only zlib. Rows are compressed as they arrive and flushed out in
+# IDAT chunks of about chunk_size bytes, so memory use does not grow with
+# the image height.
+class PNGWriter:
+    def __init__(self, f, width, height, level=6, chunk_size=1 << 16, depth=1):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.depth = depth
+        self.z = zlib.compressobj(level)
+        self.pending = []
+        self.pending_size = 0
+        f.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, depth, 0, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self.f.write(struct.pack('>I', len(data)))
+        self.f.write(kind)
+        self.f.write(data)
+        self.f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def _queue(self, data):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+        if self.pending_size >= self.chunk_size:
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def write_row(self, row):
+        row = np.asarray(row)
+        # Filter type 0, then greyscale bits or bytes where 0 is black
+        if self.depth == 8:
+            self.write_scanline(b'\x00' + grey_levels(row).tobytes())
+        else:
+            self.write_scanline(b'\x00' + np.packbits(row < 0.5).tobytes())
+
+    # write_scanline adds one already filtered and packed row
+    def write_scanline(self, line):
+        self._queue(self.z.compress(line))
+
+    def close(self):
+        self.pending.append(self.z.flush())
+        self._chunk(b'IDAT', b''.join(self.pending))
+        self._chunk(b'IEND', b'')
+
+# image_writer returns the writer for an output mode: 'pbm', 'pgm',
+# 'ppm' or 'png'. With grey=True a PNG keeps shades of grey.
+def image_writer(f, mode, width, height, grey=False):
+    if mode == 'png':
+        return PNGWriter(f, width, height, depth=8 if grey else 1)
+    return NetpbmWriter(f, width, height, NETPBM_MAGIC[mode])
+
+# center_row pads a null boundary row, which shrinks by two cells per
+# generation, back out to the full width with 0s on either side.
+def center_row(row, width):
+    if len(row) == width:
+        return row
+    pad = (width - len(row)) // 2
+    return np.pad(row, (pad, width - len(row) - pad))
+
+# pool_rows reduces a run to an image, yielding one row per row_factor
+# rows of cells, each centred to width and then cut into blocks of factor
+# columns. A block becomes its first cell with method 'sample', the
+# fraction of live cells in it with 'mean', or 1 if any (for 'max') or
+# all (for 'min') of its cells are live. A short last block or group of
+# rows is pooled over the cells it has.
+def pool_rows(rows, width, factor=1, row_factor=1, method='sample'):
+    if method not in POOL_METHODS:
+        raise ValueError(f"unknown pooling method: {method!r}")
+    starts = np.arange(0, width, factor)
+    group = []
+    for row in rows:
+        group.append(center_row(row, width))
+        if len(group) == row_factor:
+            yield _pool(group, starts, width, method)
+            group = []
+    if group:
+        yield _pool(group, starts, width, method)
+
+def _pool(group, starts, width, method):
+    if method == 'sample' or not len(starts):
+        return group[0][starts]
+    block = np.array(group, dtype=np.uint8)
+    if method == 'mean':
+        sums = np.add.reduceat(block.sum(axis=0, dtype=np.int64), starts)
+        return sums / (np.diff(np.append(starts, width)) * len(group))
+    if method == 'max':
+        return np.maximum.reduceat(block.max(axis=0), starts)
+    return np.minimum.reduceat(block.min(axis=0), starts)
+
+# _Extension is a writer appending to an existing image. finish runs once
+# the last row is written, to fix up or replace the file.
+class _Extension:
+    def __init__(self, writer, finish):
+        self.writer = writer
+        self.finish = finish
+
+    def write_row(self, row):
+        self.writer.write_row(row)
+
+    def close(self):
+        self.writer.close()
+        self.finish()
+
+# extend_writer opens an image written by image_writer to add the given
+# number of rows to, returning (writer, width). Netpbm rows go straight onto the
+# end of the file and the height is rewritten once they are all written.
+# A finished PNG's zlib stream can't be reopened, so its old rows are
+# copied through decompressed into a new file that replaces it on close.
+def extend_writer(path, mode, rows):
+    if mode == 'png':
+        return _extend_png(path, rows)
+
+    f = open(path, 'r+b')
+    match = _NETPBM_HEADER.match(f.read(64))
+    if not match or match.group(1).decode('ascii') != NETPBM_MAGIC[mode]:
+        f.close()
+        raise ValueError(f"{path} is not a {mode.upper()} image")
+    width, height = int(match.group(2)), int(match.group(4))
+    field = match.end(4) - match.start(3)
+    new_height = f"{height + rows:>{field}}".encode('ascii')
+    if len(new_height) > field or not new_height[:1].isspace():
+        f.close()
+        raise ValueError(f"no room to grow the height in {path}")
+    f.seek(0, os.SEEK_END)
+
+    def finish():
+        f.seek(match.start(3))
+        f.write(new_height)
+        f.close()
+    return _Extension(NetpbmWriter(f, width, None, NETPBM_MAGIC[mode], header=False), finish), width
+
+def _extend_png(path, rows):
+    src = open(path, 'rb')
+    if src.read(8) != b'\x89PNG\r\n\x1a\n':
+        src.close()
+        raise ValueError(f"{path} is not a PNG image")
+    dst = open(path + '.tmp', 'wb')
+    writer = None
+    z = zlib.decompressobj()
+    pending = b''
+    while True:
+        length, kind = struct.unpack('>I4s', src.read(8))
+        data = src.read(length)
+        src.read(4)
+        if kind == b'IHDR':
+            width, height, depth, color = struct.unpack('>IIBB', data[:10])
+            if depth not in (1, 8) or color != 0:
+                src.close()
+                dst.close()
+                os.remove(path + '.tmp')
+                raise ValueError(f"{path} is not a 1 or 8 bit greyscale PNG")
+            writer = PNGWriter(dst, width, height + rows, depth=depth)
+            line = 1 + (width * depth + 7) // 8
+        elif kind == b'IDAT':
+            pending += z.decompress(data)
+            whole = len(pending) - len(pending) % line
+            for i in range(0, whole, line):
+                writer.write_scanline(pending[i:i+line])
+            pending = pending[whole:]
+        elif kind == b'IEND':
+            break
+    src.close()
+
+    def finish():
+        dst.close()
+        os.replace(path + '.tmp', path)
+    return _Extension(writer, finish), width
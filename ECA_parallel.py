@@ -0,0 +1,144 @@
+# Domain-decomposed evolution of a single very wide elementary cellular
+# automaton. The lattice is split into contiguous slices, one per worker
+# process, and the generations live in shared memory. Every round each
+# worker reads its slice of the current generation plus a halo of k cells
+# on either side, evolves that locally for k generations and writes back
+# only its own slice, so workers synchronise once per k generations.
+#
+# The shared memory is a ring of 2k + 1 generations. While the workers
+# compute one round, the main process copies out the one before, so runs
+# stream a round at a time like ECA.iter_gens.
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import threading
+import numpy as np
+import ECA as eca
+
+# ParallelECA produces exactly the same generations as ECA, spread
+# across processes worker processes with a halo of halo cells.
+class ParallelECA(eca.ECA):
+    def __init__(self, rule, processes=None, halo=1):
+        super().__init__(rule)
+        self.processes = processes or mp.cpu_count()
+        self.halo = max(int(halo), 1)
+
+    # spacetime runs an ECA for N generations and returns the (N, width)
+    # uint8 array laid out like ECA.spacetime. Cycle detection has to look
+    # at every whole generation as it appears, so those runs are serial.
+    def spacetime(self, state, b_cond, N, cycle=None):
+        if cycle:
+            return super().spacetime(state, b_cond, N, cycle)
+        self.cycle = None
+        cells = eca.as_cells(state)
+        gens = np.zeros((N, len(cells)), dtype=np.uint8)
+        for x, block in self._rounds(cells, b_cond, N):
+            gens[x:x+len(block)] = block
+        return gens
+
+    # iter_gens yields the N generations of a run one at a time, as
+    # ECA.iter_gens does, holding only the ring in shared memory. The run
+    # stops its workers if the consumer stops early.
+    def iter_gens(self, state, b_cond, N=None):
+        if N is None:
+            raise ValueError("ParallelECA needs the number of generations")
+        cells = eca.as_cells(state)
+        width = len(cells)
+        for x, block in self._rounds(cells, b_cond, N):
+            for row in block:
+                yield row[x:width-x] if (b_cond=='null') else row
+                x += 1
+
+    # _rounds evolves cells for N generations, yielding (x, block) for
+    # generation 0 and then each round, block a copy of generations x
+    # onwards laid out like the rows of ECA.spacetime.
+    def _rounds(self, cells, b_cond, N):
+        if b_cond not in ('null', 'periodic'):
+            raise ValueError(f"unknown boundary condition: {b_cond!r}")
+        width = len(cells)
+        if N == 0:
+            return
+        yield 0, cells[None].copy()
+        if N == 1 or width == 0:
+            for x in range(1, N):
+                yield x, np.zeros((1, width), dtype=np.uint8)
+            return
+
+        rows = min(N, 2 * self.halo + 1)
+        shm = shared_memory.SharedMemory(create=True, size=rows * width)
+        procs = []
+        barrier = None
+        finished = False
+        try:
+            gens = np.ndarray((rows, width), dtype=np.uint8, buffer=shm.buf)
+            gens[:] = 0
+            gens[0] = cells
+
+            workers = min(self.processes, width)
+            bounds = np.linspace(0, width, workers + 1).astype(int)
+            ctx = mp.get_context()
+            barrier = ctx.Barrier(workers + 1)
+            procs = [ctx.Process(target=_worker,
+                                 args=(shm.name, self.rule, b_cond, N, rows, width,
+                                       bounds[i], bounds[i+1], self.halo, barrier))
+                     for i in range(workers)]
+            for p in procs:
+                p.start()
+            for g in range(0, N - 1, self.halo):
+                try:
+                    barrier.wait()
+                except threading.BrokenBarrierError:
+                    raise RuntimeError("a ParallelECA worker process failed")
+                steps = min(self.halo, N - 1 - g)
+                yield g + 1, gens[[(g + j) % rows for j in range(1, steps + 1)]]
+            finished = True
+        finally:
+            if barrier is not None and not finished:
+                barrier.abort()
+            for p in procs:
+                p.join()
+            shm.close()
+            shm.unlink()
+        if any(p.exitcode != 0 for p in procs):
+            raise RuntimeError("a ParallelECA worker process failed")
+
+# _worker evolves columns a to b of the lattice. Each round it copies
+# columns a - k to b + k of the current generation (wrapping under the
+# periodic boundary, 0 past the ends under the null one), steps that
+# k times with the null rule so it shrinks back to a to b, and writes its
+# own columns of each of the k new generations. The round ends at the
+# barrier the main process waits on too; a broken barrier means the run
+# was stopped.
+def _worker(shm_name, rule, b_cond, N, rows, width, a, b, halo, barrier):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        gens = np.ndarray((rows, width), dtype=np.uint8, buffer=shm.buf)
+        myrule = eca.ECA(rule)
+        cols = np.arange(a - halo, b + halo)
+        for g in range(0, N - 1, halo):
+            steps = min(halo, N - 1 - g)
+            span = cols[halo-steps:len(cols)-halo+steps]
+            if a - steps >= 0 and b + steps <= width:
+                ext = gens[g % rows, a-steps:b+steps]
+            elif (b_cond=='periodic'):
+                ext = gens[g % rows].take(span, mode='wrap')
+            else:
+                ext = np.zeros(len(span), dtype=np.uint8)
+                inside = (span >= 0) & (span < width)
+                ext[inside] = gens[g % rows, span[inside]]
+            for j in range(1, steps + 1):
+                ext = myrule.step(ext, 'null')
+                if (b_cond=='null'):
+                    # Zero the cells that fall outside generation g + j
+                    lo = a - steps + j
+                    ext[:max(g + j - lo, 0)] = 0
+                    ext[max(width - g - j - lo, 0):] = 0
+                gens[(g + j) % rows, a:b] = ext[steps-j:steps-j+b-a]
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        shm.close()
@@ -0,0 +1,116 @@
+# Phase timing and resource accounting for a Generate_ECA run. RunStats
+# is a lap timer: each call to lap closes a phase, such as building the
+# initial state or rendering, and rows drawn through count_rows have the
+# time spent producing them booked to the evolve phase, so streaming runs
+# still separate simulation from rendering. The summary adds counts of
+# generations, cells and output bytes and the peak memory use.
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# peak_rss_mb returns the peak resident set size of this process in MB,
+# or None where getrusage isn't available (Windows).
+def peak_rss_mb():
+    if sys.platform == 'win32':
+        return None
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss /= 1024
+    return rss / 1024
+
+class RunStats:
+    def __init__(self, trace_memory=False):
+        self.phases = {}
+        self.counts = {'generations': 0, 'cells': 0, 'output_bytes': 0}
+        self.trace_memory = trace_memory
+        if trace_memory:
+            tracemalloc.start()
+        self.start = self.last = time.perf_counter()
+        self.inner = 0.0
+
+    def _add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    # lap books the time since the last lap to phase name, less any time
+    # count_rows spent producing rows in between.
+    def lap(self, name):
+        now = time.perf_counter()
+        self._add(name, now - self.last - self.inner)
+        self.last = now
+        self.inner = 0.0
+
+    # count_rows passes rows through, counting them and their cells and
+    # timing each one's production as part of phase.
+    def count_rows(self, rows, phase='evolve'):
+        rows = iter(rows)
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            seconds = time.perf_counter() - start
+            self._add(phase, seconds)
+            self.inner += seconds
+            self.counts['generations'] += 1
+            self.counts['cells'] += len(row)
+            yield row
+
+    # count_output adds the size of a file, or of every file under a
+    # directory, to the output bytes.
+    def count_output(self, path):
+        if not path or not os.path.exists(path):
+            return
+        if os.path.isdir(path):
+            size = sum(os.path.getsize(os.path.join(root, f))
+                       for root, _, files in os.walk(path) for f in files)
+        else:
+            size = os.path.getsize(path)
+        self.counts['output_bytes'] += size
+
+    # summary returns the phase times, counts and peak memory as a dict,
+    # the peak RSS None where it can't be measured.
+    def summary(self):
+        total = time.perf_counter() - self.start
+        out = {'seconds': total, 'phases': dict(self.phases), 'counts': dict(self.counts),
+               'peak_rss_mb': peak_rss_mb()}
+        if self.counts['cells'] and self.phases.get('evolve'):
+            out['cells_per_s'] = self.counts['cells'] / self.phases['evolve']
+        if self.trace_memory:
+            out['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        return out
+
+    # report prints the summary, or writes it as JSON to path if one is
+    # given.
+    def report(self, path=None):
+        summary = self.summary()
+        if path:
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=1)
+            print(f"Run statistics saved to {path}")
+            return
+        print(f"\nRun statistics ({summary['seconds']:.3f}s total):")
+        for name, seconds in summary['phases'].items():
+            share = seconds / summary['seconds'] if summary['seconds'] else 0
+            print(f"  {name:<12} {seconds:9.3f}s  {share:6.1%}")
+        for name, value in summary['counts'].items():
+            print(f"  {name:<12} {value:,}")
+        if 'cells_per_s' in summary:
+            print(f"  {'throughput':<12} {summary['cells_per_s']:.3e} cells/s")
+        if summary['peak_rss_mb'] is None:
+            print(f"  {'peak RSS':<12} unavailable")
+        else:
+            print(f"  {'peak RSS':<12} {summary['peak_rss_mb']:.1f} MB")
+        if 'traced_peak_mb' in summary:
+            print(f"  {'traced peak':<12} {summary['traced_peak_mb']:.1f} MB")
+
+    # dump_memory writes a tracemalloc snapshot to path, for
+    # tracemalloc.Snapshot.load, and stops tracing.
+    def dump_memory(self, path):
+        tracemalloc.take_snapshot().dump(path)
+        tracemalloc.stop()
+        print(f"Memory snapshot saved to {path}")
@@ -0,0 +1,123 @@
+# Streaming statistics for elementary cellular automaton runs. An
+# Analysis is fed the generations of a run one at a time, as they are
+# produced, and writes one row of measurements per generation to a CSV or
+# NPY file, so even runs far too big to hold in memory can be analysed:
+#
+#   density        fraction of live cells
+#   entropy        Shannon entropy, in bits, of the k-cell blocks
+#   block_*        frequency of each k-cell block, e.g. block_010
+#   corr_r         correlation of cells r apart, <s_i s_i+r> - <s>^2
+#   damage         cells differing from a twin run started with one cell
+#                  flipped (damage spreading)
+#   damage_width   distance from the first to the last differing cell, + 1
+#   lyapunov       ln(damage) / generation, the damage growth rate
+#
+# Blocks and correlations wrap around under the periodic boundary and stay
+# inside the row under the null one.
+
+import math
+import numpy as np
+from numpy.lib import format as npy_format
+import ECA as eca
+
+# Analysis measures a run of rule from state under b_cond, writing the
+# series to path: a .npy file gets a structured array with a field per
+# column, anything else CSV. N, the number of generations, is needed
+# up front for .npy output. perturb is the cell flipped for the damage
+# twin, by default the middle one.
+class Analysis:
+    def __init__(self, rule, state, b_cond, path, N=None, block_size=3, max_distance=4,
+                 perturb=None):
+        self.myrule = eca.ECA(rule)
+        self.b_cond = b_cond
+        self.block_size = block_size
+        self.max_distance = max_distance
+        cells = eca.as_cells(state)
+        self.twin = cells.copy()
+        if len(cells):
+            self.twin[len(cells) // 2 if perturb is None else perturb] ^= 1
+        self.x = 0
+        self.weights = 1 << np.arange(block_size - 1, -1, -1)
+        self.columns = (['generation', 'density', 'entropy'] +
+                        [f"block_{i:0{block_size}b}" for i in range(1 << block_size)] +
+                        [f"corr_{r}" for r in range(1, max_distance + 1)] +
+                        ['damage', 'damage_width', 'lyapunov'])
+        self.path = path
+        if path.endswith('.npy'):
+            if N is None:
+                raise ValueError("NPY output needs the number of generations")
+            dtype = [(c, np.int64 if c in ('generation', 'damage', 'damage_width') else np.float64)
+                     for c in self.columns]
+            self.out = npy_format.open_memmap(path, mode='w+', dtype=dtype, shape=(N,))
+        else:
+            self.out = open(path, 'w')
+            self.out.write(','.join(self.columns) + '\n')
+
+    # update measures the next generation of the run, a row of cells as
+    # ECA.iter_gens yields it, and records it.
+    def update(self, row):
+        row = np.asarray(row, dtype=np.uint8)
+        n = len(row)
+        live = np.count_nonzero(row)
+        density = live / n if n else 0.0
+        values = [self.x, density]
+
+        # k-block counts from a sliding window of block indices
+        k = self.block_size
+        if (self.b_cond=='periodic') and n:
+            # Windows wrap, even more than once round a row shorter than k
+            windows = n
+            ext = row.take(np.arange(n + k - 1), mode='wrap')
+        else:
+            ext = row
+            windows = max(n - k + 1, 0)
+        index = np.zeros(windows, dtype=np.int64)
+        for j in range(k if windows else 0):
+            index += ext[j:j+windows].astype(np.int64) * self.weights[j]
+        counts = np.bincount(index, minlength=1 << k)
+        freqs = counts / windows if windows else np.zeros(1 << k)
+        p = freqs[freqs > 0]
+        values.append(float(-np.sum(p * np.log2(p))))
+        values.extend(freqs.tolist())
+
+        for r in range(1, self.max_distance + 1):
+            if (self.b_cond=='periodic') and n:
+                pairs = np.count_nonzero(row & np.roll(row, -r)) / n
+            elif n > r:
+                pairs = np.count_nonzero(row[:-r] & row[r:]) / (n - r)
+            else:
+                pairs = density * density
+            values.append(pairs - density * density)
+
+        diff = np.flatnonzero(row != self.twin)
+        damage = len(diff)
+        values.append(damage)
+        values.append(int(diff[-1] - diff[0] + 1) if damage else 0)
+        values.append(math.log(damage) / self.x if damage and self.x else float('nan'))
+        self.twin = self.myrule.step(self.twin, self.b_cond)
+
+        if isinstance(self.out, np.ndarray):
+            self.out[self.x] = tuple(values)
+        else:
+            self.out.write(','.join(f"{v:.6g}" if isinstance(v, float) else str(v)
+                                    for v in values) + '\n')
+        self.x += 1
+
+    # track passes rows through, measuring each one on the way.
+    def track(self, rows):
+        for row in rows:
+            self.update(row)
+            yield row
+        self.close()
+
+    # run measures all of rows.
+    def run(self, rows):
+        for row in rows:
+            self.update(row)
+        self.close()
+
+    def close(self):
+        if isinstance(self.out, np.ndarray):
+            self.out.flush()
+        else:
+            self.out.close()
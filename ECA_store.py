@@ -0,0 +1,154 @@
+# On-disk spacetime store for elementary cellular automata runs too big
+# to hold in memory. A store file is a 64 byte header followed by one row
+# of little-endian uint64 words per generation, packed as by
+# ECA.pack_cells (null boundary generations in the centred layout of
+# ECA.spacetime). Any range of rows can be memory-mapped without reading
+# the rest of the file.
+#
+# Appends are crash-safe: new rows are written and flushed to disk before
+# the header's generation count is updated, so after a crash the store
+# still holds every committed generation and a run resumes from the last.
+
+import base64
+import json
+import os
+import struct
+import numpy as np
+import ECA as eca
+
+MAGIC = b'ECASTORE'
+VERSION = 1
+HEADER_SIZE = 64
+BOUNDARIES = ('periodic', 'null')
+
+# Header: magic, version, rule, boundary index, width, committed generations
+_HEADER = struct.Struct('<8sIIQQQ')
+
+# SpacetimeStore is an open store file. Use create to start a new one
+# and SpacetimeStore(path) to open an existing one.
+class SpacetimeStore:
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} is not an ECA spacetime store")
+        magic, version, rule, boundary, width, generations = _HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION or boundary >= len(BOUNDARIES):
+            raise ValueError(f"{path} is not an ECA spacetime store")
+        self.rule = rule
+        self.b_cond = BOUNDARIES[boundary]
+        self.width = width
+        self.generations = generations
+        self.row_words = (width + 63) // 64
+
+    # create writes an empty store for the given rule, boundary and width,
+    # replacing any file at path, and returns it open for appending.
+    @classmethod
+    def create(cls, path, rule, b_cond, width):
+        rule = eca.ECA(rule).number
+        with open(path, 'wb') as f:
+            f.write(_header(rule, BOUNDARIES.index(b_cond), width, 0))
+            f.flush()
+            os.fsync(f.fileno())
+        return cls(path, writable=True)
+
+    def __len__(self):
+        return self.generations
+
+    # rows memory-maps the packed words of generations start to stop as a
+    # read-only (stop - start, words) array.
+    def rows(self, start=0, stop=None):
+        stop = self.generations if stop is None else min(stop, self.generations)
+        start = min(start, stop)
+        if start == stop:
+            return np.zeros((0, self.row_words), dtype='<u8')
+        return np.memmap(self.path, dtype='<u8', mode='r',
+                         offset=HEADER_SIZE + start * self.row_words * 8,
+                         shape=(stop - start, self.row_words))
+
+    # spacetime returns generations start to stop as a PackedSpacetime, so
+    # renderers unpack each generation only as they reach it.
+    def spacetime(self, start=0, stop=None):
+        return eca.PackedSpacetime(self.rows(start, stop), self.width, self.b_cond, start)
+
+    # cells returns generation x unpacked, as N_Gens would give it.
+    def cells(self, x):
+        return self.spacetime(x, x + 1)[0]
+
+    # append adds packed generations (a (rows, words) array) after the last
+    # committed one and commits them. Rows left over from an interrupted
+    # append are overwritten.
+    def append(self, rows):
+        if not self.writable:
+            raise ValueError(f"{self.path} is open read-only")
+        rows = np.ascontiguousarray(rows, dtype='<u8').reshape(-1, self.row_words)
+        with open(self.path, 'r+b') as f:
+            f.seek(HEADER_SIZE + self.generations * self.row_words * 8)
+            f.write(rows.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            self.generations += len(rows)
+            f.seek(0)
+            f.write(_header(self.rule, BOUNDARIES.index(self.b_cond), self.width, self.generations))
+            f.flush()
+            os.fsync(f.fileno())
+
+# _header packs a store header, padded to HEADER_SIZE bytes.
+def _header(rule, boundary, width, generations):
+    return _HEADER.pack(MAGIC, VERSION, rule, boundary, width, generations).ljust(HEADER_SIZE, b'\0')
+
+# record runs rule from state for N generations into the store at path,
+# committing every commit_every generations. If the store already holds
+# part of the same run (same rule, boundary and initial state) it resumes
+# from the last committed generation instead of starting again; a store
+# holding any other run is replaced. Returns the store.
+def record(rule, state, b_cond, N, path, commit_every=1024):
+    myrule = eca.PackedECA(rule)
+    cells = eca.as_cells(state)
+    width = len(cells)
+    store = None
+    if os.path.exists(path):
+        store = SpacetimeStore(path, writable=True)
+        if (store.rule, store.b_cond, store.width) != (myrule.number, b_cond, width) or \
+                (store.generations and not np.array_equal(store.rows(0, 1)[0], eca.pack_cells(cells))):
+            store = None
+    if store is None:
+        store = SpacetimeStore.create(path, myrule.number, b_cond, width)
+    if store.generations == 0 and N > 0:
+        store.append(eca.pack_cells(cells))
+
+    x = store.generations
+    words = store.rows(x - 1, x)[0].copy() if x else None
+    batch = []
+    while x < N:
+        words = myrule.step_packed(words, width, b_cond, x)
+        batch.append(words)
+        x += 1
+        if len(batch) >= commit_every or x == N:
+            store.append(np.array(batch))
+            batch = []
+    return store
+
+# save_checkpoint writes a small JSON checkpoint of a finished run: its
+# rule and boundary, the number of the last generation, that generation
+# packed into base64, and the full lattice width. Anything else passed in
+# extra (such as how the run was rendered) is saved alongside.
+def save_checkpoint(path, rule, b_cond, generation, state, width, **extra):
+    cells = eca.as_cells(state)
+    checkpoint = dict(extra, rule=eca.ECA(rule).number, boundary=b_cond,
+                      generation=generation, width=width, state_width=len(cells),
+                      state=base64.b64encode(np.packbits(cells).tobytes()).decode('ascii'))
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(path + '.tmp', path)
+
+# load_checkpoint reads a checkpoint written by save_checkpoint, returning
+# it as a dict with 'state' unpacked to a uint8 cell array.
+def load_checkpoint(path):
+    with open(path) as f:
+        checkpoint = json.load(f)
+    packed = np.frombuffer(base64.b64decode(checkpoint['state']), dtype=np.uint8)
+    checkpoint['state'] = np.unpackbits(packed, count=checkpoint.pop('state_width'))
+    return checkpoint
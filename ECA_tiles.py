@@ -0,0 +1,227 @@
+# Zoomable tile pyramid export for elementary cellular automaton runs
+# too big for a single image. Level 0 holds the run at one pixel per cell
+# and every level above it halves both sides, averaging 2x2 blocks into
+# shades of grey, until the whole run fits in one tile. Each level is cut
+# into fixed-size PNG tiles, written to DIR/<level>/<row>_<column>.png,
+# and DIR/index.html is a small static viewer that pans and zooms
+# through them.
+#
+# The pyramid is built in one pass over the generations: each level keeps
+# only the band of rows making up its current row of tiles, writes those
+# tiles once the band fills, and passes every pair of rows on to the next
+# level as one.
+
+import json
+import os
+import numpy as np
+import ECA_images as images
+
+TILE_SIZE = 256
+
+# _Level accumulates one row of tiles of a pyramid level. Binary levels
+# keep their rows packed 8 pixels a byte as PNG scanlines; grey ones keep
+# a byte of darkness (0 white to 255 black) per pixel.
+class _Level:
+    def __init__(self, directory, level, width, tile_size, binary, compression):
+        self.directory = os.path.join(directory, str(level))
+        self.compression = compression
+        os.makedirs(self.directory, exist_ok=True)
+        self.width = width
+        self.tile_size = tile_size
+        self.binary = binary
+        row_bytes = (width + 7) // 8 if binary else width
+        self.band = np.zeros((tile_size, row_bytes), dtype=np.uint8)
+        self.rows = 0
+        self.tile_row = 0
+        self.pending = None
+
+    # add appends a row of darkness to the band, writing the band's tiles
+    # once it is full. It returns the row to pass up to the next level
+    # after every second row, otherwise None.
+    def add(self, dark):
+        if self.binary:
+            self.band[self.rows] = np.packbits(dark < 128)
+        else:
+            self.band[self.rows] = dark
+        self.rows += 1
+        if self.rows == self.tile_size:
+            self.flush()
+        if self.pending is None:
+            self.pending = dark
+            return None
+        up = _halve(self.pending.astype(np.uint16) + dark)
+        self.pending = None
+        return up
+
+    # finish writes the last, partial band and returns the row left to
+    # pass up, an unpaired row pooled with itself, or None.
+    def finish(self):
+        self.flush()
+        if self.pending is None:
+            return None
+        up = _halve(2 * self.pending.astype(np.uint16))
+        self.pending = None
+        return up
+
+    def flush(self):
+        if not self.rows:
+            return
+        size = self.tile_size
+        for col, x in enumerate(range(0, self.width, size)):
+            w = min(size, self.width - x)
+            path = os.path.join(self.directory, f"{self.tile_row}_{col}.png")
+            with open(path, 'wb') as f:
+                writer = images.PNGWriter(f, w, self.rows, level=self.compression,
+                                          depth=1 if self.binary else 8)
+                if self.binary:
+                    tile = self.band[:self.rows, x // 8:(x + w + 7) // 8]
+                else:
+                    tile = 255 - self.band[:self.rows, x:x + w]
+                # Every scanline with its filter type 0 byte, in one go
+                lines = np.zeros((len(tile), tile.shape[1] + 1), dtype=np.uint8)
+                lines[:, 1:] = tile
+                writer.write_scanline(lines.tobytes())
+                writer.close()
+        self.rows = 0
+        self.tile_row += 1
+
+# _halve averages a row of summed pairs of darkness values over pairs of
+# columns, the last column of an odd row counting twice.
+def _halve(pairs):
+    if len(pairs) % 2:
+        pairs = np.append(pairs, pairs[-1])
+    return ((pairs[0::2] + pairs[1::2] + 2) // 4).astype(np.uint8)
+
+# pyramid_levels returns the number of levels for a width x height run,
+# enough for the top level to fit in a single tile.
+def pyramid_levels(width, height, tile_size=TILE_SIZE):
+    levels = 1
+    while max(width, height) > tile_size:
+        width, height = (width + 1) // 2, (height + 1) // 2
+        levels += 1
+    return levels
+
+# TilePyramid writes the pyramid of a width x height run into directory,
+# fed one row at a time like the writers in ECA_images (1 or a fraction
+# for black). With grey=False level 0 is written as 1 bit tiles. Tiles
+# are compressed at zlib level compression, by default the fastest, as
+# chaotic runs barely compress anyway.
+class TilePyramid:
+    def __init__(self, directory, width, height, tile_size=TILE_SIZE, grey=False, title="",
+                 compression=1):
+        if tile_size % 8:
+            raise ValueError("tile_size must be a multiple of 8")
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.title = title
+        self.levels = []
+        for level in range(pyramid_levels(width, height, tile_size)):
+            self.levels.append(_Level(directory, level, width, tile_size, level == 0 and not grey,
+                                      compression))
+            width = (width + 1) // 2
+
+    def write_row(self, row):
+        dark = 255 - images.grey_levels(row)
+        for level in self.levels:
+            dark = level.add(dark)
+            if dark is None:
+                break
+
+    # close writes the remaining partial tiles of every level, bottom up,
+    # and the viewer.
+    def close(self):
+        for i, level in enumerate(self.levels):
+            dark = level.finish()
+            for above in self.levels[i+1:]:
+                if dark is None:
+                    break
+                dark = above.add(dark)
+        meta = {'width': self.width, 'height': self.height, 'tile': self.tile_size,
+                'levels': len(self.levels), 'title': self.title}
+        with open(os.path.join(self.directory, 'index.html'), 'w') as f:
+            f.write(VIEWER.replace('PYRAMID', json.dumps(meta)))
+
+# The viewer: drag to pan, scroll to zoom. It shows the level whose
+# pixels are closest to, but no smaller than, a screen pixel.
+VIEWER = """<!DOCTYPE html>
+<html>
+<head>
+<title>ECA tile viewer</title>
+<style>
+  html, body { margin: 0; height: 100%; overflow: hidden; background: #f0f0f0; }
+  #view { position: absolute; inset: 0; cursor: grab; }
+  #view img { position: absolute; image-rendering: crisp-edges; image-rendering: pixelated; }
+  #info { position: fixed; bottom: 10px; left: 10px; padding: 5px 10px; font-family: monospace;
+          background: rgba(255, 255, 255, 0.7); border-radius: 5px; }
+</style>
+</head>
+<body>
+<div id="view"></div>
+<div id="info"></div>
+<script>
+  const pyramid = PYRAMID;
+  const view = document.getElementById('view');
+  const info = document.getElementById('info');
+  const tiles = new Map();
+  let scale = Math.min(window.innerWidth / pyramid.width, window.innerHeight / pyramid.height);
+  let originX = (window.innerWidth - pyramid.width * scale) / 2;
+  let originY = (window.innerHeight - pyramid.height * scale) / 2;
+
+  function draw() {
+    const level = Math.max(0, Math.min(pyramid.levels - 1, Math.floor(Math.log2(1 / scale))));
+    const span = pyramid.tile * 2 ** level;
+    const cols = Math.ceil(pyramid.width / span), rows = Math.ceil(pyramid.height / span);
+    const x0 = Math.max(0, Math.floor(-originX / scale / span));
+    const x1 = Math.min(cols - 1, Math.floor((window.innerWidth - originX) / scale / span));
+    const y0 = Math.max(0, Math.floor(-originY / scale / span));
+    const y1 = Math.min(rows - 1, Math.floor((window.innerHeight - originY) / scale / span));
+    const wanted = new Set();
+    for (let ty = y0; ty <= y1; ty++) {
+      for (let tx = x0; tx <= x1; tx++) {
+        const key = level + '/' + ty + '_' + tx;
+        wanted.add(key);
+        let img = tiles.get(key);
+        if (!img) {
+          img = new Image();
+          img.src = key + '.png';
+          img.onload = () => { img.style.width = img.naturalWidth * 2 ** level * scale + 'px'; };
+          tiles.set(key, img);
+          view.appendChild(img);
+        }
+        img.style.left = originX + tx * span * scale + 'px';
+        img.style.top = originY + ty * span * scale + 'px';
+        if (img.naturalWidth) img.style.width = img.naturalWidth * 2 ** level * scale + 'px';
+      }
+    }
+    for (const [key, img] of tiles) {
+      if (!wanted.has(key)) { img.remove(); tiles.delete(key); }
+    }
+    info.textContent = pyramid.title + ' ' + pyramid.width + ' x ' + pyramid.height +
+                       ', level ' + level + ', zoom ' + scale.toPrecision(3);
+  }
+
+  let drag = null;
+  view.addEventListener('mousedown', e => { drag = [e.clientX - originX, e.clientY - originY]; });
+  window.addEventListener('mouseup', () => { drag = null; });
+  window.addEventListener('mousemove', e => {
+    if (!drag) return;
+    originX = e.clientX - drag[0];
+    originY = e.clientY - drag[1];
+    draw();
+  });
+  view.addEventListener('wheel', e => {
+    e.preventDefault();
+    const factor = e.deltaY < 0 ? 1.25 : 0.8;
+    originX = e.clientX - (e.clientX - originX) * factor;
+    originY = e.clientY - (e.clientY - originY) * factor;
+    scale *= factor;
+    draw();
+  }, { passive: false });
+  window.addEventListener('resize', draw);
+  draw();
+</script>
+</body>
+</html>
+"""
@@ -1,55 +1,145 @@
 import ECA as eca
+import ECA_images as images
+import ECA_parallel
+import ECA_hashlife
+import ECA_store
+import ECA_cache
+import ECA_stats
+import ECA_tiles
 import numpy as np
 import os
 import sys
 import argparse
+import cProfile
+import base64
+import contextlib
+import io
+import itertools
+import shutil
+import time
+from multiprocessing import Pool, shared_memory
 
 # randbstr randomly generates a binary string of input length.
-def randbstr(stringlength):
-    rng = np.random.default_rng()
-    key = ''
-    for i in range(stringlength):
-        temp = str(rng.integers(1, endpoint = True))
-        key += temp
-    return key
+def randbstr(stringlength, seed=None):
+    return cells_to_str(random_state(stringlength, seed=seed))
 
 # initcentercell returns binary string with a single 1 in the center,
 # taking as input the number of zeroes on either side of the 1.
 def initcentercell(numZeroes):
-    key = ''
-    for i in range(numZeroes):
-        key += '0'
-    key += '1'
-    for i in range(numZeroes):
-        key += '0'
-    return key
-
-# Visualize the cellular automata data using ASCII or a simple custom renderer
-def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='periodic', rule=None):
-    height, width = len(data), len(data[0])
-    
-    if mode == "ascii":
-        # ASCII visualization (▓ for 1, space for 0)
-        output = ""
-        for row in data:
-            line = ""
-            for i in range(0, len(row), downsample):
-                if row[i] == 1:
-                    line += "▓"
-                else:
-                    line += " "
-            output += line + "\n"
-        
-        if output_file:
-            with open(output_file, 'w') as f:
-                f.write(output)
-            print(f"Output saved to {output_file}")
+    return '0' * numZeroes + '1' + '0' * numZeroes
+
+# cells_to_str returns a cell array as a binary string.
+def cells_to_str(cells):
+    return (np.asarray(cells, dtype=np.uint8) + ord('0')).tobytes().decode('ascii')
+
+# random_state returns width random cells, each 1 with probability
+# density, drawn in one go from a generator seeded with seed (None for a
+# fresh one). Even odds take one random bit per cell.
+def random_state(width, density=0.5, seed=None):
+    rng = np.random.default_rng(seed)
+    if density == 0.5:
+        return np.unpackbits(np.frombuffer(rng.bytes((width + 7) // 8), dtype=np.uint8), count=width)
+    return (rng.random(width) < density).view(np.uint8)
+
+# seeds_state returns width cells that are 1 only at the given positions;
+# negative positions count from the right.
+def seeds_state(width, positions):
+    cells = np.zeros(width, dtype=np.uint8)
+    cells[np.asarray(positions, dtype=np.int64)] = 1
+    return cells
+
+# pattern_state returns width cells repeating a binary string pattern.
+def pattern_state(width, pattern):
+    return np.resize(eca.as_cells(pattern), width)
+
+# load_state reads an initial state from a file: a .npy array, a text
+# file of 0s and 1s (whitespace ignored), or anything else as packed
+# bits, 8 cells a byte with the first cell in the high bit. With width
+# given only the first width cells are kept, and a file holding fewer is
+# an error.
+def load_state(path, width=None):
+    if path.endswith('.npy'):
+        cells = np.asarray(np.load(path), dtype=np.uint8).ravel()
+        if not np.all(cells <= 1):
+            raise ValueError(f"{path} holds values other than 0 and 1")
+    else:
+        data = np.fromfile(path, dtype=np.uint8)
+        text = np.isin(data, np.frombuffer(b'01 \t\r\n', dtype=np.uint8))
+        if len(data) and np.all(text):
+            cells = data[(data == ord('0')) | (data == ord('1'))] - ord('0')
         else:
-            print(output)
-    
-    elif mode == "html":
-        # HTML visualization (creates a simple HTML file with colored cells)
-        html = """<!DOCTYPE html>
+            cells = np.unpackbits(data)
+    if width is not None:
+        if len(cells) < width:
+            raise ValueError(f"{path} holds {len(cells)} cells, fewer than --width {width}")
+        cells = cells[:width]
+    return cells
+
+# Characters for ascii cells from dead to live, with shades for pooled
+# cells in between
+ASCII_SHADES = " ░▒▓"
+# Characters for two rows of cells to a line: neither, the upper, the
+# lower or both live
+HALF_BLOCKS = " ▀▄█"
+# Characters written at a time by the ascii renderer
+ASCII_CHUNK = 1 << 16
+
+# ascii_lines turns rows into lines of text, each row by one lookup of
+# its shade levels in a table of UTF-32 code points. With half_blocks
+# two rows go to a line, a cell drawn if at least half live.
+def ascii_lines(rows, half_blocks=False):
+    if half_blocks:
+        codes = np.array([ord(c) for c in HALF_BLOCKS + "\n"], dtype='<u4')
+        rows = iter(rows)
+        for upper in rows:
+            lower = next(rows, None)
+            levels = (np.asarray(upper) >= 0.5).astype(np.intp)
+            if lower is not None:
+                levels += 2 * (np.asarray(lower) >= 0.5)
+            yield codes[np.append(levels, 4)].tobytes().decode('utf-32-le')
+    else:
+        codes = np.array([ord(c) for c in ASCII_SHADES + "\n"], dtype='<u4')
+        for row in rows:
+            levels = np.rint(np.asarray(row, dtype=np.float64) * 3).astype(np.intp)
+            yield codes[np.append(levels, 4)].tobytes().decode('utf-32-le')
+
+# write_ascii writes lines to out in chunks of about ASCII_CHUNK
+# characters, flushing each so the run shows up as it is computed. With
+# fps set each line is written as a frame of its own, at fps lines a
+# second, until the lines run out or the run is interrupted.
+def write_ascii(lines, out, fps=None):
+    if fps:
+        frame = 1 / fps
+        deadline = time.perf_counter()
+        try:
+            for line in lines:
+                out.write(line)
+                out.flush()
+                deadline += frame
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline -= delay
+        except KeyboardInterrupt:
+            pass
+        return
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= ASCII_CHUNK:
+            out.write(''.join(chunk))
+            out.flush()
+            chunk = []
+            size = 0
+    out.write(''.join(chunk))
+    out.flush()
+
+# The html visualization: a page of image strips, one per run or
+# extension of a run, stacked in the grid
+HTML_HEAD = """<!DOCTYPE html>
 <html>
 <head>
 <style>
@@ -60,23 +150,10 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
     flex-direction: column;
     line-height: 0;
   }
-  .row {
-    display: flex;
-    height: 2px;
-  }
-  .cell0 { 
-    width: 2px; 
-    height: 2px; 
-    background-color: white; 
-    margin: 0;
-    padding: 0;
-  }
-  .cell1 { 
-    width: 2px; 
-    height: 2px; 
-    background-color: black; 
-    margin: 0;
-    padding: 0;
+  .grid img {
+    display: block;
+    image-rendering: crisp-edges;
+    image-rendering: pixelated;
   }
 </style>
 </head>
@@ -84,66 +161,196 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
 <div class="container">
 <div class="grid">
 """
-        # Process the data row by row
-        for row_idx, row in enumerate(data):
-            html += '<div class="row">\n'
-            for i in range(0, len(row), downsample):
-                cell_class = "cell1" if row[i] == 1 else "cell0"
-                html += f'<div class="{cell_class}"></div>'
-            html += '</div>\n'
-        
-        html += "</div></div></body></html>"
-        
-        if not output_file:
-            output_file = "eca_visualization.html"
+HTML_TAIL = "</div></div></body></html>"
+
+# peek_width returns (rows, width) for data, taking the width from its
+# first row unless one is given; rows still yields every row.
+def peek_width(data, width=None):
+    rows = iter(data)
+    first = next(rows, None)
+    if width is None:
+        width = 0 if first is None else len(first)
+    if first is not None:
+        rows = itertools.chain([first], rows)
+    return rows, width
+
+# html_strip returns an <img> tag holding height pooled rows of width
+# pixels as a base64 PNG, in shades of grey if grey is set.
+def html_strip(rows, width, height, grey=False):
+    if not width or not height:
+        return ""
+    buf = io.BytesIO()
+    writer = images.PNGWriter(buf, width, height, depth=8 if grey else 1)
+    for row in rows:
+        writer.write_row(row)
+    writer.close()
+    png = base64.b64encode(buf.getvalue()).decode('ascii')
+    return (f'<img src="data:image/png;base64,{png}" width="{2 * width}" '
+            f'height="{2 * height}" alt="">\n')
+
+# append_html inserts rows_html into an html visualization just before its
+# closing tail, leaving the rows already in the file untouched.
+def append_html(path, rows_html, tail):
+    with open(path, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(size - len(tail) - 64, 0))
+        end = f.read()
+        at = end.rfind(tail.encode('ascii'))
+        if at < 0:
+            raise ValueError(f"{path} doesn't end like an ECA html visualization")
+        f.seek(size - len(end) + at)
+        f.truncate()
+        f.write((rows_html + tail).encode('utf-8'))
+
+# track_last passes rows through, keeping the latest one in last[0].
+def track_last(rows, last):
+    for row in rows:
+        last[0] = row
+        yield row
+
+# pool_run pools a run down to the rows and columns that are drawn. It
+# returns the pooled rows, their width and the drawn height, None if
+# height is.
+def pool_run(data, height=None, downsample=1, row_downsample=1, pool='sample', width=None):
+    if height is not None:
+        height = -(-height // row_downsample)
+    rows, width = peek_width(data, width)
+    rows = images.pool_rows(rows, width, downsample, row_downsample, pool)
+    return rows, len(range(0, width, downsample)), height
+
+# write_rows draws pooled rows, width cells wide and height rows high, to
+# the binary file f a row at a time: ascii lines, an html page or a Netpbm
+# or PNG image, in shades of grey if grey is set. An html page holds one
+# image strip, or one per band rows if band is given so it can be sent
+# while the run is still going.
+def write_rows(f, rows, mode, width, height, grey=False, half_blocks=False, band=None):
+    if mode == "ascii":
+        for line in ascii_lines(rows, half_blocks):
+            f.write(line.encode('utf-8'))
+    elif mode == "html":
+        f.write(HTML_HEAD.encode('utf-8'))
+        if band is None:
+            f.write(html_strip(rows, width, height, grey).encode('ascii'))
+        else:
+            rows = iter(rows)
+            while True:
+                strip = list(itertools.islice(rows, band))
+                if not strip:
+                    break
+                f.write(html_strip(strip, width, len(strip), grey).encode('ascii'))
+        f.write(HTML_TAIL.encode('utf-8'))
+    else:
+        writer = images.image_writer(f, mode, width, height, grey)
+        for row in rows:
+            writer.write_row(row)
+        writer.close()
+
+# default_output returns the file a visualization mode writes when no
+# output file is given, or None for ascii, which prints to the console.
+def default_output(mode):
+    if mode == "ascii":
+        return None
+    if mode == "3d":
+        return "eca_visualization_3d.html"
+    if mode == "tiles":
+        return "eca_tiles"
+    return f"eca_visualization.{mode}"
+
+# Visualize the cellular automata data using ASCII or a simple custom renderer.
+# Every mode writes each row as it arrives, so data may be a generator such
+# as ECA.iter_gens; the html and image modes then need the row count as height.
+# Rows are first pooled by images.pool_rows, downsample columns and
+# row_downsample rows to a pixel, with pool as the method; 'mean' pooling
+# draws shades of grey.
+# With append=True the rows are added to the end of an existing ascii, html
+# or image output, width then giving the full lattice width of the run.
+# ascii can draw two rows to a line with half_blocks, and with fps set it
+# animates the run a line at a time.
+def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='periodic', rule=None, height=None,
+                  open_browser=True, width=None, append=False, row_downsample=1, pool='sample',
+                  half_blocks=False, fps=None):
+    if not output_file:
+        output_file = default_output(mode)
+    
+    # Pool the run down to the rows and columns that are drawn
+    if height is None and mode not in ("ascii", "3d"):
+        height = len(data)
+    rows, ds_width, height = pool_run(data, height, downsample, row_downsample, pool, width)
+    grey = (pool == 'mean')
+    
+    if mode == "ascii":
+        # ASCII visualization (▓ for 1, space for 0, shades between)
+        out = open(output_file, 'a' if append else 'w') if output_file else sys.stdout
+        write_ascii(ascii_lines(rows, half_blocks), out, fps)
         
-        with open(output_file, 'w') as f:
-            f.write(html)
+        if output_file:
+            out.close()
+            print(f"Output saved to {output_file}")
+        else:
+            print()
+    
+    elif mode == "html":
+        # HTML visualization: the spacetime is embedded as a base64 PNG
+        # drawn at 2 pixels per cell, so the page size follows the bits
+        # rather than one element per cell
+        if append:
+            append_html(output_file, html_strip(rows, ds_width, height, grey), HTML_TAIL)
+        else:
+            with open(output_file, 'wb') as f:
+                write_rows(f, rows, mode, ds_width, height, grey)
         print(f"Visualization saved to {output_file}")
         
         # Try to open the HTML file in browser
-        try:
-            import webbrowser
-            webbrowser.open('file://' + os.path.realpath(output_file))
-        except:
-            pass
+        if open_browser:
+            try:
+                import webbrowser
+                webbrowser.open('file://' + os.path.realpath(output_file))
+            except:
+                pass
     
-    elif mode == "ppm":
-        # Generate a simple PPM image file (P3 format)
-        if not output_file:
-            output_file = "eca_visualization.ppm"
-        
-        with open(output_file, 'w') as f:
-            # PPM header
-            f.write(f"P3\n{width // downsample} {height}\n255\n")
-            
-            # Write pixel data
-            for row in data:
-                for i in range(0, len(row), downsample):
-                    if row[i] == 1:
-                        f.write("0 0 0 ")  # Black for 1
-                    else:
-                        f.write("255 255 255 ")  # White for 0
-                f.write("\n")
+    elif mode in images.NETPBM_MAGIC or mode == "png":
+        # Generate a binary PBM/PGM/PPM or a PNG image file, one buffer
+        # write per row
+        if append:
+            writer, _ = images.extend_writer(output_file, mode, height)
+            for row in rows:
+                writer.write_row(row)
+            writer.close()
+        else:
+            with open(output_file, 'wb') as f:
+                write_rows(f, rows, mode, ds_width, height, grey)
         
-        print(f"PPM image saved to {output_file}")
+        print(f"{mode.upper()} image saved to {output_file}")
 
+    elif mode == "tiles" and not append:
+        # Zoomable tile pyramid, a directory of PNG tiles and a viewer
+        pyramid = ECA_tiles.TilePyramid(output_file, ds_width, height, grey=grey,
+                                        title=f"Rule {rule}" if rule is not None else "")
+        for row in rows:
+            pyramid.write_row(row)
+        pyramid.close()
+        print(f"Tile pyramid saved to {output_file}, view {os.path.join(output_file, 'index.html')}")
+        
+        if open_browser:
+            try:
+                import webbrowser
+                webbrowser.open('file://' + os.path.realpath(os.path.join(output_file, 'index.html')))
+            except:
+                pass
+    
+    elif mode in ("3d", "tiles") and append:
+        print(f"{mode} visualizations can't be extended; render the whole run again instead.")
+    
     elif mode == "3d" and boundary == 'periodic':
         # 3D visualization (creates a HTML file with Three.js for cylindrical view)
-        if not output_file:
-            output_file = "eca_visualization_3d.html"
+        # The cells go in as a base64 bitfield, each pooled row packed
+        # 8 cells a byte with the first cell in the high bit
+        packed = [np.packbits(np.asarray(row) >= 0.5).tobytes() for row in rows]
         
         # Get downsampled dimensions
-        ds_width = width // downsample
-        ds_height = height
-        
-        # Prepare data for 3D
-        cylindrical_data = []
-        for row in data:
-            cylindrical_row = []
-            for i in range(0, len(row), downsample):
-                cylindrical_row.append(1 if row[i] == 1 else 0)
-            cylindrical_data.append(cylindrical_row)
+        ds_height = len(packed)
+        cell_data = base64.b64encode(b''.join(packed)).decode('ascii')
         
         # Create the HTML with Three.js
         html = """<!DOCTYPE html>
@@ -246,10 +453,15 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
         <div>Width: CELL_WIDTH</div>
     </div>
     <script>
-        // ECA data
-        const ecaData = CELL_DATA;
-        const width = ecaData[0].length;
-        const height = ecaData.length;
+        // ECA data: rows of cells packed 8 to a byte, high bit first
+        const ecaBits = Uint8Array.from(atob("CELL_DATA"), c => c.charCodeAt(0));
+        const width = CELL_WIDTH;
+        const height = GEN_COUNT;
+        const rowBytes = Math.ceil(width / 8);
+        
+        function cellAt(x, y) {
+            return (ecaBits[y * rowBytes + (x >> 3)] >> (7 - (x & 7))) & 1;
+        }
         
         // Color settings
         let cell1Color = "#000000";  // Black for 1 cells
@@ -301,22 +513,56 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
         let solidCylinder = null;
         let cell1Material = null;
         let cell0Material = null;
-        let cellObjects = { '0': [], '1': [] };  // Store references to cell objects by type
+        let cellMeshes = { '0': null, '1': null };  // One instanced mesh per cell value
+        const boxGeometry = new THREE.BoxGeometry(cellSize, cellSize, cellSize * 0.5);
         
         // Convert hex color to THREE.Color
         function hexToThreeColor(hex) {
             return new THREE.Color(hex);
         }
         
-        // Create individual cells for each data point
+        // Create a single instanced mesh holding a cube for every cell of
+        // the given value, placed on the cylinder surface
+        function createCells(value, material) {
+            let count = 0;
+            for (let y = 0; y < height; y++) {
+                for (let x = 0; x < width; x++) {
+                    if (cellAt(x, y) === value) count++;
+                }
+            }
+            if (count === 0) return null;
+            
+            const mesh = new THREE.InstancedMesh(boxGeometry, material, count);
+            const cell = new THREE.Object3D();
+            let i = 0;
+            for (let y = 0; y < height; y++) {
+                for (let x = 0; x < width; x++) {
+                    if (cellAt(x, y) !== value) continue;
+                    
+                    // Calculate position on cylinder surface, facing outward
+                    const angle = (x / width) * Math.PI * 2;
+                    cell.position.set(Math.sin(angle) * cylinderRadius,
+                                      (height / 2) - y,
+                                      Math.cos(angle) * cylinderRadius);
+                    cell.rotation.y = angle;
+                    cell.updateMatrix();
+                    mesh.setMatrixAt(i++, cell.matrix);
+                }
+            }
+            mesh.instanceMatrix.needsUpdate = true;
+            cylinderGroup.add(mesh);
+            return mesh;
+        }
+        
+        // Create the cell meshes and cylinders
         function createScene() {
             // Clear existing cells
             while(cylinderGroup.children.length > 0) { 
                 cylinderGroup.remove(cylinderGroup.children[0]); 
             }
-            
-            // Reset cell object references
-            cellObjects = { '0': [], '1': [] };
+            for (const value of ['0', '1']) {
+                if (cellMeshes[value]) cellMeshes[value].dispose();
+            }
             
             // Create materials with current colors
             cell1Material = new THREE.MeshLambertMaterial({ 
@@ -327,34 +573,11 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
                 color: hexToThreeColor(cell0Color)
             });
             
-            // Create 3D cubes for cells
-            const boxGeometry = new THREE.BoxGeometry(cellSize, cellSize, cellSize * 0.5);
-            
-            for (let y = 0; y < height; y++) {
-                for (let x = 0; x < width; x++) {
-                    const cellValue = ecaData[y][x];
-                    
-                    // Skip 0 cells if not rendering them
-                    if (cellValue === 0 && !renderZeroCells) continue;
-                    
-                    // Choose material based on cell value
-                    const material = cellValue === 1 ? cell1Material : cell0Material;
-                    const cube = new THREE.Mesh(boxGeometry, material);
-                    
-                    // Calculate position on cylinder surface
-                    const angle = (x / width) * Math.PI * 2;
-                    cube.position.x = Math.sin(angle) * cylinderRadius;
-                    cube.position.z = Math.cos(angle) * cylinderRadius;
-                    cube.position.y = (height / 2) - y;
-                    
-                    // Rotate cube to face outward from cylinder center
-                    cube.rotation.y = angle;
-                    
-                    // Add to the scene and store reference by cell type
-                    cylinderGroup.add(cube);
-                    cellObjects[cellValue].push(cube);
-                }
-            }
+            // 0 cells are only created when they are shown
+            cellMeshes = {
+                '0': renderZeroCells ? createCells(0, cell0Material) : null,
+                '1': createCells(1, cell1Material)
+            };
             
             // Create a wireframe cylinder
             const wireGeometry = new THREE.CylinderGeometry(
@@ -415,9 +638,9 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
             }
             
             // For 0 cells, need to handle visibility based on renderZeroCells
-            cellObjects['0'].forEach(cell => {
-                cell.visible = renderZeroCells;
-            });
+            if (cellMeshes['0']) {
+                cellMeshes['0'].visible = renderZeroCells;
+            }
         }
         
         // Position camera
@@ -468,7 +691,7 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
             renderZeroCells = document.getElementById('renderZeroCells').checked;
             
             // If toggling 0 cell visibility, we need to recreate the scene
-            if (renderZeroCells !== (cellObjects['0'].length > 0)) {
+            if (renderZeroCells && !cellMeshes['0']) {
                 createScene();
             } else {
                 // Just update colors
@@ -495,63 +718,353 @@ def visualize_eca(data, mode="ascii", downsample=4, output_file=None, boundary='
         html = html.replace('RULE_NUMBER', str(rule if rule is not None else 'N/A'))
         html = html.replace('GEN_COUNT', str(ds_height))
         html = html.replace('CELL_WIDTH', str(ds_width))
-        html = html.replace('CELL_DATA', str(cylindrical_data))
+        html = html.replace('CELL_DATA', cell_data)
         
         with open(output_file, 'w') as f:
             f.write(html)
         print(f"3D visualization saved to {output_file}")
         
         # Try to open the HTML file in browser
-        try:
-            import webbrowser
-            webbrowser.open('file://' + os.path.realpath(output_file))
-        except:
-            pass
+        if open_browser:
+            try:
+                import webbrowser
+                webbrowser.open('file://' + os.path.realpath(output_file))
+            except:
+                pass
     
     elif mode == "3d" and boundary != 'periodic':
         print("3D cylindrical visualization is only available with periodic boundary conditions.")
         print("Please use --boundary periodic for 3D visualization.")
 
+# parse_rules turns a rule list such as "0-255" or "30,90,110" into a
+# sorted list of rule numbers.
+def parse_rules(spec):
+    rules = set()
+    for part in spec.split(','):
+        lo, _, hi = part.strip().partition('-')
+        rules.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(rules)
+
+# cell_updates counts the cells computed by an N generation run.
+def cell_updates(width, boundary, generations):
+    if boundary == 'null':
+        return sum(max(width - 2 * x, 0) for x in range(1, generations))
+    return width * max(generations - 1, 0)
+
+# sweep_output returns the output file for one rule of a sweep. The
+# --output name may contain {rule}; otherwise the rule number is added
+# before its extension.
+def sweep_output(output_file, mode, rule):
+    if not output_file:
+        ext = {'ascii': 'txt', 'html': 'html', '3d': 'html'}.get(mode, mode)
+        if mode == 'tiles':
+            return f"eca_rule{rule:03d}_tiles"
+        return f"eca_rule{rule:03d}.{ext}"
+    if '{rule}' in output_file:
+        return output_file.replace('{rule}', str(rule))
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_rule{rule:03d}{ext}"
+
+# Sweep workers attach to the initial state in shared memory once, when
+# the pool starts, and render every rule they are handed from it.
+_sweep_shm = None
+_sweep_state = None
+
+def _sweep_init(shm_name, width):
+    global _sweep_shm, _sweep_state
+    _sweep_shm = shared_memory.SharedMemory(name=shm_name)
+    _sweep_state = np.ndarray(width, dtype=np.uint8, buffer=_sweep_shm.buf)
+    _sweep_state.flags.writeable = False
+
+def _sweep_rule(job):
+    (rule, boundary, generations, mode, downsample, row_downsample, pool, output_file, backend,
+     half_blocks) = job
+    start = time.perf_counter()
+    myrule = eca.PackedECA(rule) if backend == 'packed' else eca.ECA(rule)
+    data = myrule.iter_gens(_sweep_state, boundary, generations)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        visualize_eca(data, mode=mode, downsample=downsample, output_file=output_file,
+                      boundary=boundary, rule=rule, height=generations, open_browser=False,
+                      row_downsample=row_downsample, pool=pool, half_blocks=half_blocks)
+    return rule, output_file, time.perf_counter() - start
+
+# sweep_rules runs one initial state under every rule in rules across a
+# process pool, writing one output file per rule, and reports the
+# throughput in cell updates per second.
+def sweep_rules(rules, initial_state, boundary, generations, mode, downsample=1,
+                output_file=None, backend='numpy', processes=None, row_downsample=1, pool='sample',
+                half_blocks=False):
+    cells = eca.as_cells(initial_state)
+    width = len(cells)
+    shm = shared_memory.SharedMemory(create=True, size=max(width, 1))
+    try:
+        np.ndarray(width, dtype=np.uint8, buffer=shm.buf)[:] = cells
+        jobs = [(rule, boundary, generations, mode, downsample, row_downsample, pool,
+                 sweep_output(output_file, mode, rule), backend, half_blocks) for rule in rules]
+        for directory in {os.path.dirname(job[7]) for job in jobs} - {''}:
+            os.makedirs(directory, exist_ok=True)
+        start = time.perf_counter()
+        with Pool(processes, initializer=_sweep_init, initargs=(shm.name, width)) as workers:
+            for rule, path, seconds in workers.imap_unordered(_sweep_rule, jobs):
+                print(f"Rule {rule:3d}: {path} ({seconds:.2f}s)")
+        elapsed = time.perf_counter() - start
+    finally:
+        shm.close()
+        shm.unlink()
+    
+    updates = cell_updates(width, boundary, generations) * len(rules)
+    print(f"\nSwept {len(rules)} rules in {elapsed:.2f}s: "
+          f"{updates / elapsed:.3e} cell updates/s")
+    return updates / elapsed
+
+# extend_run continues the run saved in a --checkpoint file to generations
+# generations, appending the new rows to the output it was rendered to and
+# updating the checkpoint, so nothing already computed is computed again.
+def extend_run(checkpoint_file, generations, backend='numpy'):
+    checkpoint = ECA_store.load_checkpoint(checkpoint_file)
+    done = checkpoint['generation'] + 1
+    mode, boundary, rule = checkpoint['mode'], checkpoint['boundary'], checkpoint['rule']
+    if generations <= done:
+        print(f"{checkpoint_file} already holds {done} generations")
+        return
+    if mode in ("3d", "tiles"):
+        print(f"Error: {mode} visualizations can't be extended")
+        sys.exit(1)
+    row_downsample = checkpoint.get('row_downsample', 1)
+    pool = checkpoint.get('pool', 'sample')
+    if done % row_downsample:
+        print(f"Error: the run's last {done % row_downsample} generations were pooled into a "
+              f"partial row; it can't be extended")
+        sys.exit(1)
+    
+    myrule = eca.PackedECA(rule) if backend == 'packed' else eca.ECA(rule)
+    last = [checkpoint['state']]
+    rows = itertools.islice(myrule.iter_gens(checkpoint['state'], boundary, generations - done + 1), 1, None)
+    print(f"\nRule {rule}, {boundary} boundary, generations {done} to {generations - 1}:")
+    visualize_eca(track_last(rows, last), mode=mode, downsample=checkpoint['downsample'],
+                  output_file=checkpoint['output'], boundary=boundary, rule=rule,
+                  height=generations - done, open_browser=False,
+                  width=checkpoint['width'], append=True, row_downsample=row_downsample, pool=pool)
+    ECA_store.save_checkpoint(checkpoint_file, rule, boundary, generations - 1, last[0],
+                              checkpoint['width'], mode=mode, output=checkpoint['output'],
+                              downsample=checkpoint['downsample'],
+                              row_downsample=row_downsample, pool=pool)
+    print(f"Checkpoint saved to {checkpoint_file}")
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Elementary Cellular Automaton Generator')
     
     # Required arguments
-    parser.add_argument('--rule', type=int, required=True, help='Rule number (0-255)')
-    parser.add_argument('--generations', type=int, required=True, help='Number of generations')
+    rule_group = parser.add_mutually_exclusive_group()
+    rule_group.add_argument('--rule', type=int, help='Rule number (0-255)')
+    rule_group.add_argument('--rules', type=str,
+                            help='Sweep a list of rules, e.g. 0-255 or 30,90,110')
+    parser.add_argument('--generations', type=int, help='Number of generations')
     
     # Optional arguments with defaults
     parser.add_argument('--boundary', type=str, default='periodic', choices=['periodic', 'null'], 
                         help='Boundary condition (periodic or null)')
-    parser.add_argument('--init', type=str, default='random', choices=['random', 'center', 'custom'], 
+    parser.add_argument('--init', type=str, default='random',
+                        choices=['random', 'center', 'custom', 'seeds', 'pattern', 'file'], 
                         help='Initial state type')
-    parser.add_argument('--width', type=int, default=100, help='Width for random or center init')
+    parser.add_argument('--width', type=int,
+                        help='Width for generated inits (default: 100), or cells kept from --init-file')
     parser.add_argument('--custom', type=str, help='Custom initial state (binary string)')
-    parser.add_argument('--mode', type=str, default='ascii', choices=['ascii', 'html', 'ppm', '3d'], 
+    parser.add_argument('--seed', type=int, help='Random seed, for reproducible random inits')
+    parser.add_argument('--density', type=float, default=0.5,
+                        help='Probability of a 1 in a random init (default: 0.5)')
+    parser.add_argument('--positions', type=str,
+                        help='Cells set to 1 by --init seeds, e.g. 10,50,-10')
+    parser.add_argument('--pattern', type=str,
+                        help='Binary string repeated across the lattice by --init pattern')
+    parser.add_argument('--init-file', type=str,
+                        help='Initial state file for --init file: .npy, text 0s and 1s, or packed bits')
+    parser.add_argument('--mode', type=str, default='ascii', choices=['ascii', 'html', 'ppm', 'pgm', 'pbm', 'png', '3d', 'tiles'], 
                         help='Visualization mode')
     parser.add_argument('--downsample', type=int, default=1, help='Downsample factor')
+    parser.add_argument('--row-downsample', type=int, default=1,
+                        help='Generations pooled into each drawn row (default: 1)')
+    parser.add_argument('--pool', type=str, default='sample', choices=list(images.POOL_METHODS),
+                        help='How downsampled cells are combined: first cell, mean (grey), '
+                             'max or min (default: sample)')
+    parser.add_argument('--half-blocks', action='store_true',
+                        help='Draw ascii two generations to a line with half-block characters')
+    parser.add_argument('--follow', action='store_true',
+                        help='Animate an ascii run a line at a time, without end if no '
+                             '--generations is given')
+    parser.add_argument('--fps', type=float, default=20,
+                        help='Lines a second drawn by --follow (default: 20)')
     parser.add_argument('--output', type=str, help='Output file name (optional)')
+    parser.add_argument('--backend', type=str, default='numpy', choices=['numpy', 'packed', 'parallel'],
+                        help='Evolution backend: uint8 arrays, 64 cells per uint64 word, '
+                             'or the lattice split across processes')
+    parser.add_argument('--processes', type=int,
+                        help='Worker processes for --rules or --backend parallel (default: all cores)')
+    parser.add_argument('--cycle', type=str, choices=['stop', 'tile'],
+                        help='Detect the first repeated generation (periodic boundary) and stop '
+                             'there or tile the cycle over the remaining generations')
+    parser.add_argument('--at', type=int,
+                        help='Only compute generation AT, jumping ahead with the Hashlife engine')
+    parser.add_argument('--hashlife-nodes', type=int, default=1 << 20,
+                        help='Nodes and memoized results the --at engine caches before flushing '
+                             '(default: 1048576)')
+    parser.add_argument('--store', type=str,
+                        help='Record the run to a memory-mapped spacetime store, resuming it if it '
+                             'already holds part of the same run')
+    parser.add_argument('--halo', type=int, default=1,
+                        help='Generations between parallel backend synchronisations (default: 1)')
+    parser.add_argument('--cache', type=str, metavar='DIR',
+                        help='Serve runs from an on-disk cache of earlier runs, adding this one to it')
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help='Megabytes the --cache directory may hold before old runs are evicted '
+                             '(default: 1024)')
+    parser.add_argument('--analyze', type=str, metavar='FILE',
+                        help='Write per-generation density, block entropy and frequencies, '
+                             'correlations and damage spreading to a .csv or .npy file')
+    parser.add_argument('--block-size', type=int, default=3,
+                        help='Block length for --analyze entropy and frequencies (default: 3)')
+    parser.add_argument('--max-distance', type=int, default=4,
+                        help='Largest distance --analyze measures correlations at (default: 4)')
+    parser.add_argument('--checkpoint', type=str,
+                        help='Save the last generation and how the run was rendered, for --extend')
+    parser.add_argument('--extend', '--resume', type=str, metavar='CHECKPOINT',
+                        help='Continue a --checkpoint run to --generations generations, '
+                             'appending to its output')
+    parser.add_argument('--stats', type=str, nargs='?', const='', metavar='FILE',
+                        help='Time each phase and count generations, cells and output bytes; '
+                             'prints a summary, or writes JSON to FILE')
+    parser.add_argument('--profile', type=str, metavar='FILE',
+                        help='Write cProfile statistics of the run to FILE (for pstats)')
+    parser.add_argument('--tracemalloc', type=str, metavar='FILE',
+                        help='Trace allocations and write a tracemalloc snapshot to FILE')
     
     args = parser.parse_args()
     
-    # Validate rule number
-    if not (0 <= args.rule <= 255):
-        print("Error: Rule must be between 0 and 255.")
+    if args.stats is not None or args.profile or args.tracemalloc:
+        import ECA_profile
+        stats = ECA_profile.RunStats(trace_memory=bool(args.tracemalloc))
+    else:
+        stats = _NoStats()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    run_eca(args, stats)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"Profile saved to {args.profile}")
+    if args.stats is not None:
+        stats.report(args.stats)
+    if args.tracemalloc:
+        stats.dump_memory(args.tracemalloc)
+
+# _NoStats stands in for ECA_profile.RunStats when the run isn't being
+# measured.
+class _NoStats:
+    def lap(self, name):
+        pass
+
+    def count_rows(self, rows, phase='evolve'):
+        return rows
+
+    def count_output(self, path):
+        pass
+
+# run_eca carries out the run described by main's parsed arguments,
+# marking its phases in stats.
+def run_eca(args, stats):
+    # Continue a checkpointed run
+    if args.extend:
+        if args.generations is None:
+            print("Error: --extend needs --generations, the new total")
+            sys.exit(1)
+        extend_run(args.extend, args.generations, args.backend)
+        stats.lap('extend')
+        return
+    
+    if args.rule is None and args.rules is None:
+        print("Error: one of --rule or --rules is required")
+        sys.exit(1)
+    if args.generations is None and args.at is None and not args.follow:
+        print("Error: --generations (or --at) is required")
+        sys.exit(1)
+    if args.follow and (args.mode != 'ascii' or args.rules is not None or args.at is not None):
+        print("Error: --follow works with a single --rule in ascii mode")
+        sys.exit(1)
+    if args.follow and (args.store or args.cache or args.cycle or args.checkpoint or
+                        args.backend == 'parallel'):
+        print("Error: --follow can't be combined with --store, --cache, --cycle, --checkpoint "
+              "or --backend parallel")
+        sys.exit(1)
+    if args.follow and args.analyze and args.analyze.endswith('.npy') and args.generations is None:
+        print("Error: --analyze to .npy needs --generations")
+        sys.exit(1)
+    if args.fps <= 0:
+        print("Error: --fps must be positive")
+        sys.exit(1)
+    if args.cycle and (args.store or args.cache):
+        print("Error: --cycle can't be combined with --store or --cache")
+        sys.exit(1)
+    if args.store and args.cache:
+        print("Error: --store and --cache can't be combined")
+        sys.exit(1)
+    if args.at is not None and args.rules is not None:
+        print("Error: --at works with a single --rule")
+        sys.exit(1)
+    if args.hashlife_nodes < 1:
+        print("Error: --hashlife-nodes must be at least 1")
+        sys.exit(1)
+    if args.rules is not None and (args.store or args.cache or args.cycle or
+                                   args.backend == 'parallel'):
+        print("Error: --store, --cache, --cycle and --backend parallel work with a single --rule")
+        sys.exit(1)
+    if args.analyze and (args.rules is not None or args.at is not None):
+        print("Error: --analyze works with a single --rule and --generations")
+        sys.exit(1)
+    if args.downsample < 1 or args.row_downsample < 1:
+        print("Error: --downsample and --row-downsample must be at least 1")
+        sys.exit(1)
+    if args.block_size < 1 or args.max_distance < 0:
+        print("Error: --block-size must be at least 1 and --max-distance at least 0")
+        sys.exit(1)
+    if args.checkpoint and (args.rules is not None or args.at is not None):
+        print("Error: --checkpoint works with a single --rule and --generations")
+        sys.exit(1)
+    if args.cycle and args.boundary != 'periodic':
+        print("Error: --cycle needs the periodic boundary")
         sys.exit(1)
     
-    # Generate rule binary representation
-    rules = np.empty(256, dtype='U8')
-    for x in range(256):
-        rules[x] = np.binary_repr(x, 8)
+    # Validate rule numbers
+    if args.rules is not None:
+        try:
+            sweep = parse_rules(args.rules)
+        except ValueError:
+            print("Error: --rules must look like 0-255 or 30,90,110")
+            sys.exit(1)
+    else:
+        sweep = [args.rule]
+    if not all(0 <= rule <= 255 for rule in sweep):
+        print("Error: Rule must be between 0 and 255.")
+        sys.exit(1)
     
-    # Create ECA with specified rule
-    myrule = eca.ECA(rules[args.rule])
+    stats.lap('setup')
     
-    # Generate initial state
+    # Generate initial state, by default as wide as the terminal when
+    # following a run
+    if args.width is not None:
+        width = args.width
+    elif args.follow:
+        width = shutil.get_terminal_size().columns * args.downsample
+    else:
+        width = 100
     if args.init == 'random':
-        initial_state = randbstr(args.width)
+        if not 0 <= args.density <= 1:
+            print("Error: --density must be between 0 and 1")
+            sys.exit(1)
+        initial_state = random_state(width, args.density, args.seed)
     elif args.init == 'center':
-        initial_state = initcentercell(args.width // 2)
+        initial_state = initcentercell(width // 2)
     elif args.init == 'custom':
         if not args.custom:
             print("Error: Custom initial state must be provided with --custom")
@@ -561,14 +1074,134 @@ def main():
             print("Error: Custom initial state must contain only 0s and 1s")
             sys.exit(1)
         initial_state = args.custom
+    elif args.init == 'seeds':
+        try:
+            positions = [int(p) for p in (args.positions or '').split(',')]
+            initial_state = seeds_state(width, positions)
+        except (ValueError, IndexError):
+            print(f"Error: --positions must be a list of cells between -{width} and {width - 1}")
+            sys.exit(1)
+    elif args.init == 'pattern':
+        if not args.pattern or not all(c in '01' for c in args.pattern):
+            print("Error: --init pattern needs a --pattern of 0s and 1s")
+            sys.exit(1)
+        initial_state = pattern_state(width, args.pattern)
+    elif args.init == 'file':
+        if not args.init_file:
+            print("Error: --init file needs an --init-file")
+            sys.exit(1)
+        try:
+            initial_state = load_state(args.init_file, args.width)
+        except (OSError, ValueError) as e:
+            print(f"Error: can't read initial state: {e}")
+            sys.exit(1)
+    
+    stats.lap('init')
+    
+    # Sweep many rules from the same initial state in parallel
+    if args.rules is not None:
+        sweep_rules(sweep, initial_state, args.boundary, args.generations, args.mode,
+                    downsample=args.downsample, output_file=args.output,
+                    backend=args.backend, processes=args.processes,
+                    row_downsample=args.row_downsample, pool=args.pool,
+                    half_blocks=args.half_blocks)
+        stats.lap('sweep')
+        return
+    
+    # Jump straight to a single far-future generation
+    if args.at is not None:
+        hashlife = ECA_hashlife.HashlifeECA(args.rule, args.hashlife_nodes)
+        state = hashlife.state_at(initial_state, args.boundary, args.at)
+        stats.lap('evolve')
+        line = ''.join(map(str, state))
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(line + "\n")
+            print(f"Generation {args.at} saved to {args.output}")
+        else:
+            print(line)
+        stats.count_output(args.output)
+        stats.lap('render')
+        return
+    
+    # Create ECA with specified rule
+    if args.backend == 'packed':
+        myrule = eca.PackedECA(args.rule)
+    elif args.backend == 'parallel':
+        myrule = ECA_parallel.ParallelECA(args.rule, args.processes, args.halo)
+    else:
+        myrule = eca.ECA(args.rule)
+    stats.lap('rule')
+    
+    # Generate automaton. Every renderer consumes generations as they are
+    # produced, the packed backend unpacking each one only as the renderer
+    # reaches it and the parallel one handing over a round at a time.
+    # Cycle detection computes the whole run at once.
+    # A store or cache is filled first and then rendered from disk.
+    if args.store:
+        try:
+            store = ECA_store.record(args.rule, initial_state, args.boundary, args.generations,
+                                     args.store)
+        except (OSError, ValueError) as e:
+            print(f"Error: can't record to store: {e}")
+            sys.exit(1)
+        data = store.spacetime(0, args.generations)
+    elif args.cache:
+        cache = ECA_cache.SpacetimeCache(args.cache, args.cache_size << 20)
+        data = cache.spacetime(args.rule, initial_state, args.boundary, args.generations)
+    elif args.cycle:
+        data = myrule.N_Gens(initial_state, args.boundary, args.generations, cycle=args.cycle)
+    else:
+        data = myrule.iter_gens(initial_state, args.boundary, args.generations)
+    
+    generations = args.generations
+    if args.cycle:
+        if myrule.cycle:
+            transient, period = myrule.cycle
+            print(f"Cycle found: transient {transient} generations, period {period}")
+        else:
+            print(f"No repeated generation within {args.generations} generations")
+        generations = len(data)
     
-    # Generate automaton
-    data = myrule.N_Gens(initial_state, args.boundary, args.generations)
+    stats.lap('evolve')
+    
+    # Keep hold of the last generation for the checkpoint as the rows go by
+    last = [None]
+    if args.checkpoint and isinstance(data, (list, eca.PackedSpacetime)):
+        last[0] = data[-1] if len(data) else None
+    elif args.checkpoint:
+        data = track_last(data, last)
+    
+    # Measure the run as the renderer consumes it, or up front if the
+    # renderer needs the whole run
+    if args.analyze:
+        analysis = ECA_stats.Analysis(args.rule, initial_state, args.boundary, args.analyze,
+                                      generations, args.block_size, args.max_distance)
+        if isinstance(data, (list, eca.PackedSpacetime)):
+            analysis.run(data)
+        else:
+            data = analysis.track(data)
+        stats.lap('analyze')
     
     # Visualize
-    print(f"\nRule {args.rule}, {args.boundary} boundary, {args.generations} generations:")
-    visualize_eca(data, mode=args.mode, downsample=args.downsample, 
-                  output_file=args.output, boundary=args.boundary, rule=args.rule)
+    print(f"\nRule {args.rule}, {args.boundary} boundary, {generations or 'unbounded'} generations:")
+    visualize_eca(stats.count_rows(data), mode=args.mode, downsample=args.downsample, 
+                  output_file=args.output, boundary=args.boundary, rule=args.rule,
+                  height=generations, row_downsample=args.row_downsample, pool=args.pool,
+                  half_blocks=args.half_blocks, fps=args.fps if args.follow else None)
+    stats.count_output(args.output or default_output(args.mode))
+    stats.lap('render')
+    
+    if args.analyze:
+        print(f"Statistics saved to {args.analyze}")
+    
+    if args.checkpoint and last[0] is not None:
+        ECA_store.save_checkpoint(args.checkpoint, args.rule, args.boundary, generations - 1,
+                                  last[0], len(eca.as_cells(initial_state)), mode=args.mode,
+                                  output=args.output or default_output(args.mode),
+                                  downsample=args.downsample,
+                                  row_downsample=args.row_downsample, pool=args.pool)
+        print(f"Checkpoint saved to {args.checkpoint}")
 
 # If invoked as a script
 if __name__ == "__main__":
@@ -583,15 +1216,54 @@ if __name__ == "__main__":
         print("  python3 Generate_ECA.py --rule 90 --generations 75 --init custom --custom 010101")
         print("  python3 Generate_ECA.py --rule 110 --generations 50 --mode html --output rule110.html")
         print("  python3 Generate_ECA.py --rule 30 --generations 60 --mode 3d --output rule30_cylinder.html")
+        print("  python3 Generate_ECA.py --rules 0-255 --generations 500 --mode png --output sweep/rule{rule}.png")
+        print("  python3 Generate_ECA.py --rule 30 --generations 500 --mode png --checkpoint run.json")
+        print("  python3 Generate_ECA.py --extend run.json --generations 1000")
+        print("  python3 Generate_ECA.py --rule 30 --init center --follow --half-blocks")
         print("\nRequired arguments:")
         print("  --rule NUMBER         Rule number (0-255)")
-        print("  --generations NUMBER  Number of generations to run")
+        print("  --rules LIST          Or a list of rules to sweep in parallel, e.g. 0-255 or 30,90,110")
+        print("  --generations NUMBER  Number of generations to run (not needed with --at)")
         print("\nOptional arguments:")
         print("  --boundary TYPE       Boundary condition: 'periodic' or 'null' (default: periodic)")
-        print("  --init TYPE           Initial state: 'random', 'center', or 'custom' (default: random)")
-        print("  --width NUMBER        Width for random or center init (default: 100)")
+        print("  --init TYPE           Initial state: 'random', 'center', 'custom', 'seeds', 'pattern'")
+        print("                        or 'file' (default: random)")
+        print("  --width NUMBER        Width for generated inits (default: 100), or cells kept from --init-file")
         print("  --custom STRING       Custom initial state (binary string, required if --init=custom)")
-        print("  --mode TYPE           Visualization: 'ascii', 'html', 'ppm', '3d' (default: ascii)")
+        print("  --seed NUMBER         Random seed for a reproducible random init")
+        print("  --density P           Probability of a 1 in a random init (default: 0.5)")
+        print("  --positions LIST      Cells set to 1 by --init seeds, e.g. 10,50,-10")
+        print("  --pattern STRING      Binary string tiled across the lattice by --init pattern")
+        print("  --init-file FILENAME  Initial state for --init file: .npy, text 0s and 1s, or packed bits")
+        print("  --mode TYPE           Visualization: 'ascii', 'html', 'ppm', 'pgm', 'pbm', 'png', '3d'")
+        print("                        or 'tiles', a zoomable PNG tile pyramid (default: ascii)")
         print("                        Note: '3d' mode only works with periodic boundary conditions")
         print("  --downsample NUMBER   Downsample factor (default: 1)")
-        print("  --output FILENAME     Output file name (if not provided, displays in console for ascii)")
\ No newline at end of file
+        print("  --row-downsample NUMBER  Generations pooled into each drawn row (default: 1)")
+        print("  --pool METHOD         Combine downsampled cells by 'sample', 'mean' (grey), 'max' or 'min'")
+        print("                        (default: sample)")
+        print("  --half-blocks         Draw ascii two generations to a line with half-block characters")
+        print("  --follow              Animate an ascii run line by line, forever without --generations")
+        print("  --fps NUMBER          Lines a second drawn by --follow (default: 20)")
+        print("  --output FILENAME     Output file name (if not provided, displays in console for ascii)")
+        print("                        or directory for tiles")
+        print("  --backend TYPE        Evolution backend: 'numpy', 'packed' or 'parallel' (default: numpy)")
+        print("  --processes NUMBER    Worker processes for --rules or --backend parallel (default: all cores)")
+        print("  --at GENERATION       Only output generation GENERATION, via the Hashlife engine")
+        print("  --hashlife-nodes N    Nodes and memoized results --at caches before flushing (default: 1048576)")
+        print("  --cycle MODE          Detect a repeated generation and 'stop' or 'tile' the cycle")
+        print("  --store FILENAME      Record the run to a memory-mapped spacetime store (resumable)")
+        print("  --halo NUMBER         Generations between parallel backend synchronisations (default: 1)")
+        print("  --cache DIRECTORY     Reuse cached runs with the same rule, boundary and initial state")
+        print("  --cache-size MB       Size limit of the --cache directory (default: 1024)")
+        print("  --analyze FILENAME    Write per-generation statistics (density, entropy, block")
+        print("                        frequencies, correlations, damage spreading) to .csv or .npy")
+        print("  --block-size NUMBER   Block length for --analyze (default: 3)")
+        print("  --max-distance NUMBER Largest correlation distance for --analyze (default: 4)")
+        print("  --checkpoint FILE     Save the end of the run so it can be extended later")
+        print("  --stats [FILE]        Time each phase, count generations, cells and output bytes and")
+        print("                        report peak memory; prints a summary or writes JSON to FILE")
+        print("  --profile FILE        Write cProfile statistics of the run to FILE")
+        print("  --tracemalloc FILE    Trace allocations and write a tracemalloc snapshot to FILE")
+        print("  --extend FILE         Continue a checkpointed run to --generations, appending to its")
+        print("                        output (also --resume)")
\ No newline at end of file
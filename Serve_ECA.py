@@ -0,0 +1,480 @@
+# HTTP render service for elementary cellular automata. One long-running
+# asyncio server keeps a pool of worker processes that have ECA and NumPy
+# imported already, so a request pays for its own generations and nothing
+# else:
+#
+#   GET /render?rule=30&generations=500&width=800&mode=png
+#
+# streams the rendered image back while the worker is still producing it.
+# Parameters follow Generate_ECA's options: rule, generations, boundary,
+# init (random, center, custom, seeds or pattern), width, custom, seed,
+# density, positions, pattern, mode (ascii, html, ppm, pgm, pbm or png),
+# downsample, row_downsample and pool. GET /status reports the load.
+#
+# Requests for the same render that arrive while its first chunks are
+# still held share its output instead of computing it again (random inits
+# only when they give a seed). Renders waiting for a worker are held in a
+# bounded queue and requests beyond it get 503 Service Unavailable. A
+# render runs at the pace of its slowest client: the server holds only a
+# few chunks that some client has yet to be sent, and the worker blocks
+# until that client catches up. When every client has gone the render is
+# cancelled and its worker freed.
+
+import ECA as eca
+import ECA_images as images
+import Generate_ECA as generate
+import asyncio
+import argparse
+import json
+import os
+import queue
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+
+SERVE_MODES = ('ascii', 'html', 'ppm', 'pgm', 'pbm', 'png')
+CONTENT_TYPES = {'ascii': 'text/plain; charset=utf-8', 'html': 'text/html; charset=utf-8',
+                 'ppm': 'image/x-portable-pixmap', 'pgm': 'image/x-portable-graymap',
+                 'pbm': 'image/x-portable-bitmap', 'png': 'image/png'}
+
+# Bytes a worker collects before handing them to the server
+CHUNK_SIZE = 1 << 16
+# Pooled rows in each image strip of an html render
+HTML_BAND = 256
+# Seconds between checks that a worker is still alive while waiting on it
+POLL = 1.0
+
+# parse_params validates a request's query string, as parse_qs returns
+# it, and returns the render's parameters as a dict. Renders of more
+# than max_cells cells are refused.
+def parse_params(query, max_cells=10**8):
+    def get(name, kind=str, default=None):
+        values = query.get(name)
+        if not values:
+            return default
+        try:
+            return kind(values[-1])
+        except ValueError:
+            raise ValueError(f"{name} must be {kind.__name__}, not {values[-1]!r}")
+
+    params = {'rule': get('rule', int), 'generations': get('generations', int),
+              'boundary': get('boundary', default='periodic'), 'init': get('init', default='random'),
+              'mode': get('mode', default='png'), 'downsample': get('downsample', int, 1),
+              'row_downsample': get('row_downsample', int, 1), 'pool': get('pool', default='sample')}
+    if params['rule'] is None or params['generations'] is None:
+        raise ValueError("rule and generations are required")
+    if not 0 <= params['rule'] <= 255:
+        raise ValueError("rule must be between 0 and 255")
+    if params['generations'] < 1:
+        raise ValueError("generations must be at least 1")
+    if params['boundary'] not in ('periodic', 'null'):
+        raise ValueError("boundary must be periodic or null")
+    if params['mode'] not in SERVE_MODES:
+        raise ValueError(f"mode must be one of {', '.join(SERVE_MODES)}")
+    if params['downsample'] < 1 or params['row_downsample'] < 1:
+        raise ValueError("downsample and row_downsample must be at least 1")
+    if params['pool'] not in images.POOL_METHODS:
+        raise ValueError(f"pool must be one of {', '.join(images.POOL_METHODS)}")
+
+    init = params['init']
+    width = get('width', int, 100)
+    if init == 'random':
+        params['density'] = get('density', float, 0.5)
+        params['seed'] = get('seed', int)
+        if not 0 <= params['density'] <= 1:
+            raise ValueError("density must be between 0 and 1")
+    elif init == 'custom':
+        custom = get('custom', default='')
+        if not custom or not all(c in '01' for c in custom):
+            raise ValueError("init=custom needs a custom state of 0s and 1s")
+        params['custom'] = custom
+        width = len(custom)
+    elif init == 'seeds':
+        try:
+            positions = [int(p) for p in get('positions', default='').split(',')]
+        except ValueError:
+            raise ValueError("positions must be a list of cells, e.g. 10,50,-10")
+        if not all(-width <= p < width for p in positions):
+            raise ValueError(f"positions must be between -{width} and {width - 1}")
+        params['positions'] = ','.join(map(str, positions))
+    elif init == 'pattern':
+        pattern = get('pattern', default='')
+        if not pattern or not all(c in '01' for c in pattern):
+            raise ValueError("init=pattern needs a pattern of 0s and 1s")
+        params['pattern'] = pattern
+    elif init != 'center':
+        raise ValueError("init must be random, center, custom, seeds or pattern")
+    if init == 'center':
+        width = 2 * (width // 2) + 1
+    if width < 1:
+        raise ValueError("width must be at least 1")
+    if width * params['generations'] > max_cells:
+        raise ValueError(f"renders are limited to {max_cells:,} cells")
+    params['width'] = width
+    return params
+
+# render_key returns the key identifying a render for coalescing, or None
+# if it can't be shared: a random init without a seed.
+def render_key(params):
+    if params['init'] == 'random' and params.get('seed') is None:
+        return None
+    return tuple(sorted(params.items()))
+
+# initial_state builds the initial state of a render.
+def initial_state(params):
+    width = params['width']
+    if params['init'] == 'random':
+        return generate.random_state(width, params['density'], params['seed'])
+    if params['init'] == 'center':
+        return generate.initcentercell(width // 2)
+    if params['init'] == 'custom':
+        return params['custom']
+    if params['init'] == 'seeds':
+        return generate.seeds_state(width, [int(p) for p in params['positions'].split(',')])
+    return generate.pattern_state(width, params['pattern'])
+
+# render_stream renders rows, a run of generations rows, to the binary
+# file f a row at a time, drawing the mode the way visualize_eca does.
+# html pages are written as a strip of image per HTML_BAND rows.
+def render_stream(f, rows, generations, mode, downsample=1, row_downsample=1, pool='sample'):
+    rows, width, height = generate.pool_run(rows, generations, downsample, row_downsample, pool)
+    generate.write_rows(f, rows, mode, width, height, pool == 'mean', band=HTML_BAND)
+
+# _Stopped ends a render nobody is following any more.
+class _Stopped(Exception):
+    pass
+
+# _QueueWriter is a binary file that passes what is written to it on to
+# a queue, in chunks of at least CHUNK_SIZE bytes, until stop, an event,
+# is set.
+class _QueueWriter:
+    def __init__(self, out, stop):
+        self.out = out
+        self.stop = stop
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.stop.is_set():
+            raise _Stopped()
+        if self.buffer:
+            self.out.put(bytes(self.buffer))
+            self.buffer = bytearray()
+
+# render_job runs in a worker process. It renders the request described
+# by params onto out, a queue, as chunks of bytes followed by None, or by
+# a message string if the render fails. Setting stop ends the render
+# early, at the next chunk.
+def render_job(params, out, stop):
+    try:
+        f = _QueueWriter(out, stop)
+        myrule = eca.PackedECA(params['rule'])
+        rows = myrule.iter_gens(initial_state(params), params['boundary'], params['generations'])
+        render_stream(f, rows, params['generations'], params['mode'], params['downsample'],
+                      params['row_downsample'], params['pool'])
+        f.flush()
+        out.put(None)
+    except _Stopped:
+        out.put(None)
+    except Exception as e:
+        out.put(f"{type(e).__name__}: {e}")
+
+def _ready():
+    return os.getpid()
+
+# _Job is one render in flight: the chunks of output that some request
+# following it has yet to be sent, from chunk number first on, how far
+# each follower has got, and whether it has finished. Up to backlog chunks
+# are held; past that a chunk is dropped once every follower has it, and
+# a new one waits until there is room for it. A job nobody follows any
+# more is cancelled.
+class _Job:
+    def __init__(self, params, backlog=8):
+        self.params = params
+        self.backlog = backlog
+        self.chunks = []
+        self.first = 0
+        self.followers = {}
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+
+    # joinable is whether a new follower can still get the whole output.
+    def joinable(self):
+        return self.first == 0
+
+    # cancelled is whether every follower has left before the job finished.
+    def cancelled(self):
+        return not self.followers and not self.done
+
+    # join adds a follower, starting from the first chunk, and returns it.
+    def join(self):
+        follower = object()
+        self.followers[follower] = 0
+        return follower
+
+    async def leave(self, follower):
+        async with self.changed:
+            del self.followers[follower]
+            self.changed.notify_all()
+
+    # add appends a chunk, first waiting until the slowest follower is
+    # less than backlog chunks behind. A cancelled job drops it.
+    async def add(self, chunk):
+        async with self.changed:
+            while len(self.chunks) >= self.backlog and self.followers:
+                sent = min(self.followers.values(), default=self.first + len(self.chunks))
+                if sent > self.first:
+                    del self.chunks[:sent - self.first]
+                    self.first = sent
+                else:
+                    await self.changed.wait()
+            if self.followers:
+                self.chunks.append(chunk)
+            self.changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self.changed:
+            self.done = True
+            self.error = error
+            self.changed.notify_all()
+
+    # follow yields the job's chunks to follower from the first, waiting
+    # for each one as it arrives.
+    async def follow(self, follower):
+        sent = 0
+        while True:
+            async with self.changed:
+                self.followers[follower] = sent
+                self.changed.notify_all()
+                await self.changed.wait_for(
+                    lambda: sent < self.first + len(self.chunks) or self.done)
+                chunks = self.chunks[sent - self.first:]
+            for chunk in chunks:
+                yield chunk
+                sent += 1
+            if self.done and sent == self.first + len(self.chunks):
+                return
+
+# RenderServer serves renders from a pool of worker processes. Once every
+# worker is busy at most queue_size renders wait for one. Each render has
+# at most backlog chunks of output waiting for the server to take them
+# and as many waiting for its slowest client.
+class RenderServer:
+    def __init__(self, workers=None, queue_size=16, max_cells=10**8, backlog=8):
+        self.workers = workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.max_cells = max_cells
+        self.backlog = backlog
+        self.jobs = {}
+        self.tasks = set()
+        self.waiting = 0
+        self.running = 0
+        self.counts = {'requests': 0, 'renders': 0, 'coalesced': 0, 'rejected': 0, 'failed': 0,
+                       'cancelled': 0}
+
+    # start launches the workers and the shared queue process and listens
+    # on host:port.
+    async def start(self, host='127.0.0.1', port=8000):
+        self.context = mp.get_context('spawn')
+        self.manager = self.context.Manager()
+        self.readers = ThreadPoolExecutor(self.workers)
+        self.slots = asyncio.Semaphore(self.workers)
+        await self.start_pool()
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    # start_pool starts a pool of workers, waiting until all of them are up
+    # so the first requests don't pay for their start.
+    async def start_pool(self):
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=self.context)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, _ready) for _ in range(self.workers)])
+
+    def close(self):
+        self.server.close()
+        self.pool.shutdown(cancel_futures=True)
+        self.readers.shutdown()
+        self.manager.shutdown()
+
+    def status(self):
+        return dict(self.counts, workers=self.workers, running=self.running,
+                    waiting=self.waiting, queue_size=self.queue_size, in_flight=len(self.jobs))
+
+    # render waits for a worker and runs job on it, passing its output on
+    # to the job's followers as it arrives. Once they have all gone the
+    # worker is told to stop, and what it has queued already is drained so
+    # it can.
+    async def render(self, key, job):
+        loop = asyncio.get_running_loop()
+        error = None
+        pool = None
+        try:
+            async with self.slots:
+                self.waiting -= 1
+                self.running += 1
+                try:
+                    if job.cancelled():
+                        self.counts['cancelled'] += 1
+                        return
+                    out = await loop.run_in_executor(self.readers, self.manager.Queue, self.backlog)
+                    stop = await loop.run_in_executor(self.readers, self.manager.Event)
+                    pool = self.pool
+                    future = loop.run_in_executor(pool, render_job, job.params, out, stop)
+                    stopping = False
+                    while True:
+                        if job.cancelled() and not stopping:
+                            stopping = True
+                            self.counts['cancelled'] += 1
+                            await loop.run_in_executor(self.readers, stop.set)
+                        try:
+                            item = await loop.run_in_executor(self.readers, out.get, True, POLL)
+                        except queue.Empty:
+                            # A worker that finished has put everything it
+                            # will; one that crashed never puts its end
+                            if future.done() and future.exception():
+                                error = f"worker failed: {future.exception()}"
+                                break
+                            continue
+                        if item is None:
+                            break
+                        if isinstance(item, str):
+                            error = item
+                            break
+                        await job.add(item)
+                    await future
+                finally:
+                    self.running -= 1
+        except BrokenProcessPool as e:
+            # A worker died, taking the pool with it; start a new one
+            # unless another render already has
+            error = error or f"worker failed: {e}"
+            if pool is self.pool:
+                await self.start_pool()
+        except Exception as e:
+            error = error or f"{type(e).__name__}: {e}"
+        finally:
+            if error:
+                self.counts['failed'] += 1
+            if key is not None and self.jobs.get(key) is job:
+                del self.jobs[key]
+            await job.finish(error)
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            try:
+                method, target, _ = request.decode('latin-1').split(' ', 2)
+            except ValueError:
+                return await self.respond(writer, 400, "malformed request")
+            url = urlsplit(target)
+            if method != 'GET':
+                return await self.respond(writer, 405, "only GET is supported")
+            if url.path == '/status':
+                return await self.respond(writer, 200, json.dumps(self.status()), 'application/json')
+            if url.path != '/render':
+                return await self.respond(writer, 404, "try /render?rule=30&generations=100")
+            self.counts['requests'] += 1
+            try:
+                params = parse_params(parse_qs(url.query), self.max_cells)
+            except ValueError as e:
+                return await self.respond(writer, 400, str(e))
+
+            key = render_key(params)
+            job = self.jobs.get(key) if key is not None else None
+            if job is not None and job.joinable():
+                self.counts['coalesced'] += 1
+            else:
+                if self.waiting + self.running >= self.workers + self.queue_size:
+                    self.counts['rejected'] += 1
+                    return await self.respond(writer, 503, "render queue full, try again",
+                                              headers={'Retry-After': '1'})
+                job = _Job(params, self.backlog)
+                if key is not None:
+                    self.jobs[key] = job
+                self.waiting += 1
+                self.counts['renders'] += 1
+                task = asyncio.create_task(self.render(key, job))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            follower = job.join()
+            try:
+                await self.stream(writer, job, follower, params['mode'])
+            finally:
+                await job.leave(follower)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # stream sends a job's output to one client, starting the response
+    # once the first chunk is ready so a failed render still gets an error
+    # status. A slow reader holds back the render, and so everyone else
+    # following it, rather than have its output pile up in the server.
+    async def stream(self, writer, job, follower, mode):
+        started = False
+        async for chunk in job.follow(follower):
+            if not started:
+                writer.write(self.header(200, CONTENT_TYPES[mode]))
+                started = True
+            writer.write(chunk)
+            await writer.drain()
+        if not started:
+            if job.error:
+                return await self.respond(writer, 500, job.error)
+            writer.write(self.header(200, CONTENT_TYPES[mode]))
+        await writer.drain()
+
+    # header returns the status line and headers of a response whose body
+    # runs until the connection closes.
+    def header(self, status, content_type, headers=None):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", f"Content-Type: {content_type}",
+                 "Connection: close", "Cache-Control: no-store"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def respond(self, writer, status, text, content_type='text/plain; charset=utf-8',
+                      headers=None):
+        writer.write(self.header(status, content_type, headers) + text.encode('utf-8') + b'\n')
+        await writer.drain()
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+async def serve(host, port, workers, queue_size, max_cells):
+    server = RenderServer(workers, queue_size, max_cells)
+    await server.start(host, port)
+    print(f"Serving {server.workers} workers on http://{host}:{port}/render?rule=30&generations=200&mode=png")
+    try:
+        async with server.server:
+            await server.server.serve_forever()
+    finally:
+        server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Elementary Cellular Automaton Render Service')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--queue', type=int, default=16,
+                        help='Renders that may wait for a worker before requests are refused (default: 16)')
+    parser.add_argument('--max-cells', type=float, default=1e8,
+                        help='Largest render, in cells, that is accepted (default: 1e8)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue, int(args.max_cells)))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+# If invoked as a script
+if __name__ == "__main__":
+    main()